@@ -0,0 +1,45 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+from models import db
+from cache import invalidate
+import jobs
+
+
+#----------------------------------------------------------------------------#
+# Refreshing the venue_areas materialized view.
+#----------------------------------------------------------------------------#
+
+@jobs.handler('areas.refresh')
+def refresh():
+    # CONCURRENTLY keeps /venues readable during the refresh; it relies on the
+    # unique (city, state) index created with the view, and only rewrites the
+    # areas whose venues changed. Bumping the 'venues' tag records the refresh
+    # for conditional requests and every process's page cache.
+    db.session.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY venue_areas'))
+    db.session.commit()
+    invalidate('venues')
+
+def schedule_refresh():
+    # Queues a refresh in the caller's transaction, to run on a worker once
+    # the current AREAS_REFRESH_DELAY window closes. Every write in the same
+    # window, from any process, shares that one job through its idempotency
+    # key.
+    delay = max(current_app.config['AREAS_REFRESH_DELAY'], 1)
+    window = int(time.time() // delay) + 1
+    jobs.enqueue('areas.refresh', key='areas.refresh:%d' % window, delay=window * delay - time.time())
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+areas_command = AppGroup('areas', help='Maintain the venue_areas materialized view.')
+
+@areas_command.command('refresh')
+def refresh_command():
+    """Refresh venue_areas now. Also suitable for a periodic cron job."""
+    refresh()
+    click.echo('venue_areas refreshed')
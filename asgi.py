@@ -0,0 +1,104 @@
+"""ASGI entry point: the async serving mode.
+
+The read-only pages run on the event loop against an asyncio engine
+(asyncpg); everything else is handed to the regular WSGI app through
+asgiref's thread-pool adapter. The sync deployment (``app:create_app()``
+under gunicorn) is unchanged.
+
+    uvicorn --factory asgi:create_asgi_app
+"""
+from io import BytesIO
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+from app import create_app
+from models import bound_session
+
+# Endpoints that only read, and so can run over the async engine.
+ASYNC_ENDPOINTS = frozenset([
+    'venues.venues',
+    'venues.search_venues',
+    'venues.nearby_venues',
+    'venues.show_venue',
+    'artists.artists',
+    'artists.search_artists',
+    'artists.show_artist',
+    'shows.shows'
+])
+
+
+def create_asgi_app(config='config'):
+    flask_app = create_app(config)
+    engine = create_async_engine(flask_app.config['SQLALCHEMY_ASYNC_DATABASE_URI'],
+                                 **flask_app.config['ASYNC_ENGINE_OPTIONS'])
+    fallback = WsgiToAsgi(flask_app)
+    urls = flask_app.url_map.bind('localhost')
+
+    def is_async(scope):
+        try:
+            endpoint, _ = urls.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    def call_wsgi(session, environ):
+        # Runs inside SQLAlchemy's greenlet with the views' queries bound to
+        # the async session, so each round trip to Postgres suspends this
+        # request and frees the event loop for others. The views, their
+        # caching and conditional-request decorators are the sync ones.
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        with bound_session(session):
+            body = flask_app.wsgi_app(environ, start_response)
+            try:
+                chunks = list(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        return started['status'], started['headers'], chunks
+
+    async def serve(scope, receive, send):
+        body = BytesIO()
+        while True:
+            message = await receive()
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        # Reuse asgiref's scope -> environ translation.
+        adapter = WsgiToAsgiInstance(flask_app)
+        adapter.scope = scope
+        environ = adapter.build_environ(scope, body)
+
+        async with AsyncSession(engine) as session:
+            status, headers, chunks = await session.run_sync(call_wsgi, environ)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def asgi_app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await lifespan(receive, send)
+        elif scope['type'] == 'http' and is_async(scope):
+            await serve(scope, receive, send)
+        else:
+            await fallback(scope, receive, send)
+
+    return asgi_app
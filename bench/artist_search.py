@@ -0,0 +1,95 @@
+"""Artist search latency benchmark.
+
+Loads synthetic artists (bench/generate.py's catalog, 100k by default) and
+times a set of search terms two ways: the previous search, which fetched
+every ILIKE match ordered by id and then counted upcoming shows for them in
+a second query, run with index scans disabled as it was before the pg_trgm
+indexes existed; and the current search service, which pages through the
+trigram index ranked by similarity. Run it against a scratch local Postgres
+(DATABASE_URL) that is migrated to head; it inserts real rows.
+
+    DATABASE_URL=postgresql://localhost/fyyur_bench python bench/artist_search.py --reset --artists 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, text  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, Artist, Show  # noqa: E402
+import generate  # noqa: E402
+import search  # noqa: E402
+
+# From a single match to every row in the table.
+TERMS = ['Artist 4242', 'rtist 99', 'artist 1', 'Artist', 'no such artist']
+
+
+def previous_search(search_term):
+    # The search as it stood before the trigram indexes: every match comes
+    # back, then a GROUP BY over Show for their upcoming counts.
+    db.session.execute(text('SET LOCAL enable_indexscan = off'))
+    db.session.execute(text('SET LOCAL enable_bitmapscan = off'))
+    matches = db.session.query(Artist.id, Artist.name)\
+        .filter(Artist.name.ilike('%' + search_term + '%'))\
+        .order_by(Artist.id)\
+        .all()
+    ids = [m.id for m in matches]
+    counts = dict(db.session.query(Show.artist_id, func.count(Show.id))
+                  .filter(Show.artist_id.in_(ids), Show.start_time > datetime.now())
+                  .group_by(Show.artist_id)) if ids else {}
+    return [{'id': m.id, 'name': m.name, 'num_upcoming_shows': counts.get(m.id, 0)} for m in matches]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        db.session.rollback()
+    return {
+        'median_ms': round(statistics.median(samples) * 1000, 2),
+        'p95_ms': round(sorted(samples)[int(len(samples) * 0.95) - 1] * 1000, 2),
+        'min_ms': round(min(samples) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artists', type=int, default=100000)
+    parser.add_argument('--cities', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--skip-load', action='store_true', help='reuse artists already in the database')
+    parser.add_argument('--reset', action='store_true', help='truncate Venue, Artist and Show first')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.reset:
+            db.session.execute(text('TRUNCATE "Show", "Artist", "Venue" RESTART IDENTITY CASCADE'))
+            db.session.commit()
+        if not args.skip_load:
+            generate.load(Artist, generate.artists(random.Random(args.seed), args.artists, args.cities, 1.1), 5000)
+            db.session.execute(text('ANALYZE "Artist"'))
+            db.session.commit()
+        report = {'artists': db.session.query(Artist).count(), 'terms': {}}
+        for term in TERMS:
+            report['terms'][term] = {
+                'matches': search.search_artists(term, per_page=1)['count'],
+                'previous': timed(lambda: previous_search(term), args.repeat),
+                'trigram': timed(lambda: search.search_artists(term), args.repeat)
+            }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Bulk import throughput benchmark.
+
+Generates synthetic venue, artist and show rows in memory and loads them
+through the same pipeline as ``flask import``, reporting rows/sec per
+kind and how many rows were inserted, skipped and rejected. Run it
+against a scratch local Postgres (DATABASE_URL); it inserts real rows.
+
+    DATABASE_URL=postgresql://localhost/fyyur_bench python bench/bulk_import.py --rows 20000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from importer import import_stream  # noqa: E402
+from models import db, Venue, Artist  # noqa: E402
+
+GENRES = ['Jazz', 'Blues', 'Rock n Roll', 'Folk', 'Funk', 'Soul', 'Pop']
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL']
+
+
+def venues_jsonl(n, rng):
+    for i in range(n):
+        yield json.dumps({
+            'name': 'Bench Venue %d' % i,
+            'city': 'City %d' % rng.randrange(200),
+            'state': rng.choice(STATES),
+            'address': '%d Main St' % i,
+            'genres': rng.sample(GENRES, 2),
+            'facebook_link': 'https://www.facebook.com/venue%d' % i,
+            'seeking_talent': rng.random() < 0.5
+        }) + '\n'
+
+
+def artists_jsonl(n, rng):
+    for i in range(n):
+        yield json.dumps({
+            'name': 'Bench Artist %d' % i,
+            'city': 'City %d' % rng.randrange(200),
+            'state': rng.choice(STATES),
+            'genres': rng.sample(GENRES, 2),
+            'facebook_link': 'https://www.facebook.com/artist%d' % i
+        }) + '\n'
+
+
+def shows_jsonl(n, rng, venue_ids, artist_ids):
+    for _ in range(n):
+        yield json.dumps({
+            'venue_id': rng.choice(venue_ids),
+            'artist_id': rng.choice(artist_ids),
+            'start_time': '20%02d-%02d-%02d 20:00:00' % (rng.randrange(20, 30), rng.randrange(1, 13), rng.randrange(1, 29))
+        }) + '\n'
+
+
+def timed(kind, lines, batch_size):
+    stream = io.StringIO(''.join(lines))
+    start = time.perf_counter()
+    report = import_stream(kind, stream, 'jsonl', batch_size)
+    elapsed = time.perf_counter() - start
+    # Throughput counts every row the import got through, whether it was
+    # inserted, skipped by ON CONFLICT or rejected.
+    processed = report['inserted'] + report['skipped'] + len(report['errors'])
+    return {
+        'inserted': report['inserted'],
+        'skipped': report['skipped'],
+        'rejected': len(report['errors']),
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(processed / elapsed, 1) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='venues and artists to load')
+    parser.add_argument('--shows-per-row', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    with app.app_context():
+        report = {'batch_size': args.batch_size}
+        report['venues'] = timed('venues', venues_jsonl(args.rows, rng), args.batch_size)
+        report['artists'] = timed('artists', artists_jsonl(args.rows, rng), args.batch_size)
+        venue_ids = [v for v, in db.session.query(Venue.id)]
+        artist_ids = [a for a, in db.session.query(Artist.id)]
+        report['shows'] = timed('shows', shows_jsonl(args.rows * args.shows_per_row, rng, venue_ids, artist_ids),
+                                args.batch_size)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Datetime template filter micro-benchmark.
+
+Times the previous filter, which parsed each show time back out of its
+string form with dateutil and formatted it through babel's per-call pattern
+parsing, against formatting.format_datetime on native datetimes: with its
+result cache cleared before every pass ("cold"), kept ("warm"), and bypassed
+("uncached", the cached pattern and Locale alone). The times are a synthetic
+show schedule, so no database is needed; every formatted string is checked
+against the previous filter's output first.
+
+    python bench/datetime_filter.py --values 5000 --distinct 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates  # noqa: E402
+import dateutil.parser  # noqa: E402
+import formatting  # noqa: E402
+
+
+def previous_filter(value, format='medium'):
+    # The filter as it stood in config.py, fed str(start_time) like the
+    # templates were.
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def show_times(rng, n, distinct):
+    # Pages repeat a limited set of start times (three-hour slots), so the
+    # values are drawn from `distinct` slots.
+    origin = datetime(2026, 10, 18, 20, 0)
+    slots = [origin + timedelta(hours=3 * i) for i in range(distinct)]
+    return [rng.choice(slots) for _ in range(n)]
+
+
+def timed(fn, values, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for value in values:
+            fn(value)
+        samples.append(time.perf_counter() - start)
+    per_call = [s / len(values) for s in samples]
+    return {
+        'median_us': round(statistics.median(per_call) * 1e6, 2),
+        'min_us': round(min(per_call) * 1e6, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--values', type=int, default=5000)
+    parser.add_argument('--distinct', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    values = show_times(random.Random(args.seed), args.values, args.distinct)
+    for format in ('medium', 'full'):
+        for value in values[:200]:
+            assert formatting.format_datetime(value, format) == previous_filter(str(value), format), value
+
+    report = {'values': args.values, 'distinct': args.distinct}
+    for format in ('medium', 'full'):
+        report[format] = {
+            'previous': timed(lambda v: previous_filter(str(v), format), values, args.repeat),
+            # Cached pattern and locale, but no result cache.
+            'uncached': timed(lambda v: formatting._format.__wrapped__(v, format, 'en'), values, args.repeat),
+            'cold': timed(lambda v: formatting.format_datetime(v, format), values, args.repeat,
+                          setup=formatting._format.cache_clear),
+            'warm': timed(lambda v: formatting.format_datetime(v, format), values, args.repeat)
+        }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Deterministic synthetic catalog generator.
+
+Seeds a local Postgres with venues, artists and shows for the benchmarks.
+Popularity is Zipf-skewed: a few cities hold most venues, and a few venues
+and artists take most of the bookings, so popular profile pages carry
+thousands of shows while the long tail has a handful. The same seed and
+sizes always produce the same rows (use --reset to start from empty tables
+with ids from 1, and --origin to pin the dates). Shows are laid out in three-hour slots per venue around
+today, so about half are upcoming; a slot whose artist draws keep landing
+on an artist already booked at that time is left empty.
+
+    DATABASE_URL=postgresql://localhost/fyyur_bench python bench/generate.py --reset \\
+        --venues 2000 --artists 5000 --shows 100000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.dialects.postgresql import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, Venue, Artist, Show, SHOW_DEFAULT_DURATION  # noqa: E402
+import areas  # noqa: E402
+import counters  # noqa: E402
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+          'Rock n Roll', 'Soul', 'Other']
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL', 'FL', 'MA', 'CO', 'OR', 'LA']
+SLOT = timedelta(hours=3)
+
+
+def zipf_weights(n, skew):
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def city_centre(city):
+    # Seeded by the city alone, so scenarios.py can aim nearby searches at a
+    # generated city without reading the database.
+    rng = random.Random('city %d' % city)
+    return round(rng.uniform(26.0, 48.0), 5), round(rng.uniform(-123.0, -71.0), 5)
+
+
+def places(rng, n, cities, skew):
+    weights = zipf_weights(cities, skew)
+    # City i always sits in the same state, like a real city would.
+    for city in rng.choices(range(cities), cum_weights=weights, k=n):
+        yield city, 'City %d' % city, STATES[city % len(STATES)]
+
+
+def venues(rng, n, cities, skew):
+    for i, (city, name, state) in enumerate(places(rng, n, cities, skew)):
+        # Scattered a few km around the city centre; a separate generator
+        # keeps the rest of the catalog identical to earlier versions.
+        lat, lng = city_centre(city)
+        jitter = random.Random('venue %d' % i)
+        yield {
+            'name': 'Venue %d' % i,
+            'city': name,
+            'state': state,
+            'latitude': lat + jitter.uniform(-0.05, 0.05),
+            'longitude': lng + jitter.uniform(-0.05, 0.05),
+            'address': '%d Main St' % rng.randrange(1, 9999),
+            'phone': '%03d-%03d-%04d' % (rng.randrange(200, 999), rng.randrange(1000), rng.randrange(10000)),
+            'genres': rng.sample(GENRES, rng.randrange(1, 4)),
+            'image_link': 'https://picsum.photos/seed/venue%d/300/300' % i,
+            'facebook_link': 'https://www.facebook.com/venue%d' % i,
+            'seeking_talent': rng.random() < 0.4,
+            'seeking_description': 'Looking for local acts.'
+        }
+
+
+def artists(rng, n, cities, skew):
+    for i, (_, city, state) in enumerate(places(rng, n, cities, skew)):
+        yield {
+            'name': 'Artist %d' % i,
+            'city': city,
+            'state': state,
+            'phone': '%03d-%03d-%04d' % (rng.randrange(200, 999), rng.randrange(1000), rng.randrange(10000)),
+            'genres': rng.sample(GENRES, rng.randrange(1, 3)),
+            'image_link': 'https://picsum.photos/seed/artist%d/300/300' % i,
+            'facebook_link': 'https://www.facebook.com/artist%d' % i,
+            'seeking_venue': rng.random() < 0.3
+        }
+
+
+def shows(rng, n, venue_ids, artist_ids, skew, origin):
+    venue_weights = zipf_weights(len(venue_ids), skew)
+    artist_weights = zipf_weights(len(artist_ids), skew)
+    # Every show starts on a shared three-hour grid; each venue gets its own
+    # phase so venues are not all busy at the same moments.
+    phase = {venue_id: rng.randrange(56) for venue_id in venue_ids}
+    slots, busy = {}, set()
+    for venue_id in rng.choices(venue_ids, cum_weights=venue_weights, k=n):
+        # Consecutive slots per venue, alternating either side of origin, so
+        # busy venues have long histories and long calendars.
+        slot = slots.get(venue_id, 0)
+        slots[venue_id] = slot + 1
+        grid = phase[venue_id] + (slot // 2 + 1) * (1 if slot % 2 else -1)
+        # Re-draw an artist who is already booked in this slot; give up after
+        # a few tries so the output stays deterministic and bounded.
+        for artist_id in rng.choices(artist_ids, cum_weights=artist_weights, k=4):
+            if (artist_id, grid) not in busy:
+                busy.add((artist_id, grid))
+                break
+        else:
+            continue
+        start = origin + grid * SLOT
+        yield {
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': start,
+            'end_time': start + SHOW_DEFAULT_DURATION
+        }
+
+
+def load(model, rows, batch_size):
+    inserted, ids = 0, []
+    for batch in batched(rows, batch_size):
+        result = db.session.execute(insert(model).values(batch).on_conflict_do_nothing().returning(model.id))
+        batch_ids = [r for r, in result]
+        inserted += len(batch_ids)
+        ids.extend(batch_ids)
+        db.session.commit()
+    return inserted, ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=100000)
+    parser.add_argument('--cities', type=int, default=300)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for cities, venues and artists')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--origin', type=lambda v: datetime.strptime(v, '%Y-%m-%d'),
+                        help='YYYY-MM-DD the schedule is centred on; defaults to today')
+    parser.add_argument('--reset', action='store_true', help='truncate Venue, Artist, Show and the cache tag versions first')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    origin = (args.origin or datetime.now()).replace(hour=20, minute=0, second=0, microsecond=0)
+    app = create_app()
+    report = {'seed': args.seed}
+    start = time.perf_counter()
+    with app.app_context():
+        if args.reset:
+            db.session.execute(text('TRUNCATE "Show", "Artist", "Venue", "CacheTag" RESTART IDENTITY CASCADE'))
+            db.session.commit()
+        report['venues'], venue_ids = load(Venue, venues(rng, args.venues, args.cities, args.skew), args.batch_size)
+        report['artists'], artist_ids = load(Artist, artists(rng, args.artists, args.cities, args.skew),
+                                             args.batch_size)
+        report['shows'], _ = load(Show, shows(rng, args.shows, venue_ids, artist_ids, args.skew, origin),
+                                  args.batch_size)
+        report['shows_skipped'] = args.shows - report['shows']
+
+        # Rows went in below the app's write paths, so bring the derived
+        # state up to date in one pass.
+        counters.recount(Venue)
+        counters.recount(Artist)
+        db.session.commit()
+        areas.refresh()
+    report['seconds'] = round(time.perf_counter() - start, 1)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
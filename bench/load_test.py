@@ -0,0 +1,108 @@
+"""Sync vs async serving load test.
+
+Drives the read-only pages of two running servers with the same number of
+concurrent clients and reports requests/sec and latency percentiles for each
+(JSON on stdout). Start both against the same local Postgres first, e.g.
+
+    gunicorn -w 1 --threads 8 -b :8000 'app:create_app()'
+    uvicorn --factory asgi:create_asgi_app --port 8001
+    python bench/load_test.py --sync http://localhost:8000 --async http://localhost:8001
+
+Pages are fetched with ?nocache=1 so both modes hit the database.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+PATHS = [
+    '/venues',
+    '/artists',
+    '/shows',
+    '/venues/1',
+    '/artists/1',
+    '/venues/search?search_term=music',
+    '/artists/search?search_term=band'
+]
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def client(base, paths, deadline, latencies, errors, lock):
+    url = urlsplit(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        path += ('&' if '?' in path else '?') + 'nocache=1'
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 500
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors.append(path)
+    conn.close()
+
+
+def run(base, paths, concurrency, duration):
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(base, paths, deadline, latencies, errors, lock))
+               for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'url': base,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync', dest='sync_url', help='base URL of the WSGI server')
+    parser.add_argument('--async', dest='async_url', help='base URL of the ASGI server')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per mode')
+    parser.add_argument('--path', action='append', dest='paths', help='page to request (repeatable)')
+    args = parser.parse_args()
+    if not (args.sync_url or args.async_url):
+        parser.error('give --sync and/or --async')
+
+    paths = args.paths or PATHS
+    report = {'concurrency': args.concurrency, 'duration': args.duration}
+    for mode, base in (('sync', args.sync_url), ('async', args.async_url)):
+        if base:
+            report[mode] = run(base.rstrip('/'), paths, args.concurrency, args.duration)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
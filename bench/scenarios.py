@@ -0,0 +1,339 @@
+"""Scenario runner: a realistic read/write mix over every route.
+
+Drives each route of the app with weighted scenarios (about nine reads to
+one write) and reports throughput, p50/p95/p99 latency and SQL statements
+per request, overall and per scenario, as JSON. Statement counts come from
+the Server-Timing header the app sets on every response.
+
+By default the app runs in-process through Flask's test client against
+DATABASE_URL. Pass --url to drive a running server instead. Seed the database
+first with bench/generate.py, using the same --venues/--artists sizes, and
+keep each run's JSON so commits can be compared:
+
+    python bench/generate.py --reset --seed 1
+    python bench/scenarios.py --requests 5000 -o before.json
+    python bench/scenarios.py --requests 5000 --baseline before.json
+
+With --baseline, scenarios whose p95 or statement count got worse are
+listed on stderr and the exit status is 1.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import city_centre  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATEMENTS = re.compile(r'desc="(\d+) statements"')
+WORDS = ['music', 'hall', 'live', 'band', 'club', 'venue', 'artist', 'jazz', '1', '42']
+GENRES = ['Blues', 'Folk', 'Jazz', 'Pop', 'Rock n Roll', 'Soul']
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL']
+
+
+#----------------------------------------------------------------------------#
+# Scenarios.
+#----------------------------------------------------------------------------#
+# Each scenario returns (method, path, form data or body, extra headers).
+# Profile ids are Zipf-skewed like the generated bookings, so the popular
+# (and heaviest) pages are requested most.
+
+class Catalog:
+
+    def __init__(self, rng, venues, artists, skew, token):
+        self.rng = rng
+        self.venues = venues
+        self.artists = artists
+        self.token = token
+        self.venue_weights = list(itertools.accumulate(1.0 / (i + 1) ** skew for i in range(venues)))
+        self.artist_weights = list(itertools.accumulate(1.0 / (i + 1) ** skew for i in range(artists)))
+        self.counter = itertools.count()
+
+    def venue_id(self):
+        return self.rng.choices(range(1, self.venues + 1), cum_weights=self.venue_weights)[0]
+
+    def artist_id(self):
+        return self.rng.choices(range(1, self.artists + 1), cum_weights=self.artist_weights)[0]
+
+    def point(self):
+        # Near one of the busiest generated cities (see generate.city_centre).
+        lat, lng = city_centre(self.rng.randrange(10))
+        return {'lat': lat, 'lng': lng, 'radius': self.rng.choice([5, 25, 100])}
+
+    def window(self):
+        # A month by day or a year by week, starting up to a year either side
+        # of today.
+        start = datetime.now().date() + timedelta(days=self.rng.randrange(-365, 365))
+        days, bucket = self.rng.choice([(31, 'day'), (365, 'week')])
+        return {'from': start.isoformat(), 'to': (start + timedelta(days=days)).isoformat(), 'bucket': bucket}
+
+    def auth(self):
+        return {'Authorization': 'Bearer ' + self.token}
+
+    def entity_form(self, kind):
+        n = next(self.counter)
+        form = {
+            'name': 'Bench %s %d-%d' % (kind, os.getpid(), n),
+            'city': 'City %d' % self.rng.randrange(50),
+            'state': self.rng.choice(STATES),
+            'phone': '555-555-5555',
+            'genres': self.rng.sample(GENRES, 2),
+            'image_link': 'https://picsum.photos/300',
+            'facebook_link': 'https://www.facebook.com/bench',
+            'website_link': 'https://example.com',
+            'seeking_description': 'Benchmark row'
+        }
+        if kind == 'venue':
+            form['address'] = '1 Bench St'
+        return form
+
+
+def get(path, **params):
+    return 'GET', path + ('?' + urlencode(params) if params else ''), None, {}
+
+SCENARIOS = [
+    # name, weight, request factory
+    ('home', 2, lambda c: get('/')),
+    ('venues', 8, lambda c: get('/venues')),
+    ('artists', 6, lambda c: get('/artists')),
+    ('shows', 6, lambda c: get('/shows')),
+    ('shows_upcoming', 3, lambda c: get('/shows', when='upcoming')),
+    ('show_venue', 14, lambda c: get('/venues/%d' % c.venue_id())),
+    ('show_artist', 14, lambda c: get('/artists/%d' % c.artist_id())),
+    ('search_venues', 5, lambda c: ('POST', '/venues/search', {'search_term': c.rng.choice(WORDS)}, {})),
+    ('search_artists', 5, lambda c: get('/artists/search', search_term=c.rng.choice(WORDS))),
+    ('venues_nearby', 3, lambda c: get('/venues/nearby', **c.point())),
+    ('api_venues_nearby', 3, lambda c: get('/api/v1/venues/nearby', **c.point())),
+    ('search_filtered', 2, lambda c: get('/venues/search', state=c.rng.choice(STATES), genre=c.rng.randrange(1, 20))),
+    ('shows_genre', 2, lambda c: get('/shows', when='upcoming', genre=c.rng.randrange(1, 20), city='City 0')),
+    ('calendar', 2, lambda c: get('/api/v1/calendar', **c.window())),
+    ('calendar_venue', 1, lambda c: get('/api/v1/calendar', venue=c.venue_id(), **c.window())),
+    ('venue_ics', 1, lambda c: get('/venues/%d/calendar.ics' % c.venue_id())),
+    ('artist_ics', 1, lambda c: get('/artists/%d/calendar.ics' % c.artist_id())),
+    ('api_venues', 3, lambda c: get('/api/v1/venues', limit=50)),
+    ('api_venue', 2, lambda c: get('/api/v1/venues/%d' % c.venue_id())),
+    ('api_artists', 2, lambda c: get('/api/v1/artists', limit=50, fields='id,name')),
+    ('api_artist', 2, lambda c: get('/api/v1/artists/%d' % c.artist_id())),
+    ('api_shows', 3, lambda c: get('/api/v1/shows', when='upcoming', limit=50)),
+    ('api_show', 2, lambda c: get('/api/v1/shows/%d' % c.rng.randrange(1, 10 * c.venues))),
+    ('export_venues', 1, lambda c: ('GET', '/api/v1/export/venues?' + urlencode({'city': 'City 0'}), None, c.auth())),
+    ('cache_stats', 1, lambda c: get('/_cache')),
+    ('metrics', 1, lambda c: get('/_metrics')),
+    ('create_venue_form', 1, lambda c: get('/venues/create')),
+    ('create_artist_form', 1, lambda c: get('/artists/create')),
+    ('create_show_form', 1, lambda c: get('/shows/create')),
+    ('edit_venue_form', 1, lambda c: get('/venues/%d/edit' % c.venue_id())),
+    ('edit_artist_form', 1, lambda c: get('/artists/%d/edit' % c.artist_id())),
+    # Writes.
+    ('create_venue', 2, lambda c: ('POST', '/venues/create', c.entity_form('venue'), {})),
+    ('create_artist', 2, lambda c: ('POST', '/artists/create', c.entity_form('artist'), {})),
+    ('create_show', 3, lambda c: ('POST', '/shows/create', {
+        'venue_id': c.venue_id(),
+        'artist_id': c.artist_id(),
+        'start_time': '2030-%02d-%02d %02d:00:00' % (c.rng.randrange(1, 13), c.rng.randrange(1, 29),
+                                                     c.rng.randrange(24))
+    }, {})),
+    ('edit_venue', 1, lambda c: ('POST', '/venues/%d/edit' % c.venue_id(), c.entity_form('venue'), {})),
+    ('edit_artist', 1, lambda c: ('POST', '/artists/%d/edit' % c.artist_id(), c.entity_form('artist'), {})),
+    ('import_venues', 1, lambda c: ('POST', '/api/v1/import/venues?format=jsonl', ''.join(
+        json.dumps(c.entity_form('venue')) + '\n' for _ in range(5)),
+        dict(c.auth(), **{'Content-Type': 'application/x-ndjson'}))),
+    # Only ever deletes venues created by the runner (ids past the seeded ones).
+    ('delete_venue', 1, lambda c: ('DELETE', '/venues/%d' % (c.venues + c.rng.randrange(1, 50)), None, {}))
+]
+
+
+#----------------------------------------------------------------------------#
+# Transports.
+#----------------------------------------------------------------------------#
+
+class TestClientTransport:
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def __call__(self, method, path, data, headers):
+        try:
+            response = self.client.open(path, method=method, data=data, headers=headers)
+            response.get_data()
+        except Exception:
+            # A streamed body that fails part way raises out of the test
+            # client rather than turning into a 500; count it as one instead
+            # of losing the client thread and every request it had left.
+            return 500, ''
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HTTPTransport:
+
+    def __init__(self, base):
+        self.url = urlsplit(base)
+        self.conn = None
+
+    def __call__(self, method, path, data, headers):
+        if isinstance(data, dict):
+            body = urlencode(data, doseq=True)
+            headers = dict(headers, **{'Content-Type': 'application/x-www-form-urlencoded'})
+        else:
+            body = data
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=60)
+        try:
+            self.conn.request(method, self.url.path.rstrip('/') + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            return 599, ''
+        return response.status, response.getheader('Server-Timing', '')
+
+
+#----------------------------------------------------------------------------#
+# Running and reporting.
+#----------------------------------------------------------------------------#
+
+def worker(transport, catalog, n, samples, lock):
+    names = [s[0] for s in SCENARIOS]
+    weights = [s[1] for s in SCENARIOS]
+    factories = dict((s[0], s[2]) for s in SCENARIOS)
+    for name in catalog.rng.choices(names, weights=weights, k=n):
+        method, path, data, headers = factories[name](catalog)
+        start = time.perf_counter()
+        status, timing = transport(method, path, data, headers)
+        elapsed = time.perf_counter() - start
+        match = STATEMENTS.search(timing)
+        with lock:
+            samples.append((name, elapsed, status, int(match.group(1)) if match else None))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(samples, seconds=None):
+    latencies = [s[1] for s in samples]
+    statements = [s[3] for s in samples if s[3] is not None]
+    summary = {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if s[2] >= 500),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'statements_mean': round(statistics.mean(statements), 2) if statements else None,
+        'statements_max': max(statements) if statements else None
+    }
+    if seconds:
+        summary['requests_per_sec'] = round(len(samples) / seconds, 1)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(report, baseline, tolerance):
+    found = []
+    for name, now in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            found.append('%s: p95 %.1fms -> %.1fms' % (name, before['p95_ms'], now['p95_ms']))
+        if before['statements_max'] is not None and now['statements_max'] is not None \
+                and now['statements_max'] > before['statements_max']:
+            found.append('%s: up to %d -> %d statements' % (name, before['statements_max'], now['statements_max']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='drive a running server instead of the in-process app')
+    parser.add_argument('--requests', type=int, default=2000, help='total requests across all clients')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--venues', type=int, default=2000, help='seeded venues (ids 1..N)')
+    parser.add_argument('--artists', type=int, default=5000, help='seeded artists (ids 1..N)')
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-cache', action='store_true', help='disable the page cache (in-process only)')
+    parser.add_argument('--token', default=os.environ.get('BULK_API_TOKEN', 'bench'),
+                        help='bulk API token (in-process runs set it on the app)')
+    parser.add_argument('--output', '-o', help='also write the JSON report to this file')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown before flagging')
+    args = parser.parse_args()
+
+    if args.url:
+        make_transport = lambda: HTTPTransport(args.url)  # noqa: E731
+    else:
+        # The operational endpoints are off by default; the runner covers them.
+        os.environ.setdefault('CACHE_ADMIN_ENABLED', '1')
+        os.environ.setdefault('METRICS_ENABLED', '1')
+        from app import create_app
+        app = create_app()
+        # Errors are counted as 500s, as a real server would answer them.
+        app.config.update(WTF_CSRF_ENABLED=False, BULK_API_TOKEN=args.token, PROPAGATE_EXCEPTIONS=False)
+        if args.no_cache:
+            app.config['CACHE_ENABLED'] = False
+        make_transport = lambda: TestClientTransport(app)  # noqa: E731
+
+    samples, lock = [], threading.Lock()
+    per_client = max(1, args.requests // args.concurrency)
+    threads = [threading.Thread(target=worker, args=(
+        make_transport(),
+        Catalog(random.Random(args.seed + i), args.venues, args.artists, args.skew, args.token),
+        per_client, samples, lock)) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - start
+
+    report = {
+        'commit': git_commit(),
+        'target': args.url or 'in-process',
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'seconds': round(seconds, 2),
+        'total': summarize(samples, seconds),
+        'scenarios': {
+            name: summarize([s for s in samples if s[0] == name])
+            for name in sorted(set(s[0] for s in samples))
+        }
+    }
+    output = json.dumps(report, indent=2)
+    sys.stdout.write(output + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+    failed = report['total']['errors'] > 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            sys.stderr.write('regression: %s\n' % line)
+        failed = failed or bool(found)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Cold-start benchmark for the app.
+
+Runs ``python -X importtime`` in fresh interpreters and reports the time it
+takes to import the application and build it, plus the slowest imports.
+Pass ``--against PATH`` to compare with another checkout (e.g. a
+``git worktree`` of an older commit).
+
+    python bench/startup.py --runs 10
+    python bench/startup.py --against ../fyyur-baseline
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Older checkouts build the app at import time and have no factory.
+BOOT = (
+    "import app\n"
+    "if hasattr(app, 'create_app'):\n"
+    "    app.create_app()\n"
+)
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_once(path):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=path, capture_output=True, text=True, check=True
+    )
+    top_level, self_times = 0, {}
+    for match in LINE.finditer(proc.stderr):
+        self_us, cumulative_us, depth, module = match.groups()
+        self_times[module] = int(self_us)
+        if len(depth) == 1:
+            top_level += int(cumulative_us)
+    return top_level / 1000.0, self_times
+
+
+def measure(path, runs):
+    totals, slowest = [], {}
+    for _ in range(runs):
+        total, self_times = run_once(path)
+        totals.append(total)
+        for module, us in self_times.items():
+            slowest[module] = max(slowest.get(module, 0), us)
+    top = sorted(slowest.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {
+        'path': path,
+        'runs': runs,
+        'import_ms_median': round(statistics.median(totals), 1),
+        'import_ms_min': round(min(totals), 1),
+        'slowest_imports_ms': {m: round(us / 1000.0, 1) for m, us in top}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--against', help='another checkout to compare with')
+    args = parser.parse_args()
+
+    report = {'current': measure(ROOT, args.runs)}
+    if args.against:
+        report['against'] = measure(os.path.abspath(args.against), args.runs)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""/venues area grouping benchmark.
+
+Loads synthetic venues spread over many cities, then times building the
+city/state grouping in Python from the Venue table (the previous approach)
+against reading the venue_areas materialized view, plus a concurrent
+refresh of the view. Run it against a scratch local Postgres (DATABASE_URL)
+that is migrated to head; it inserts real rows.
+
+    DATABASE_URL=postgresql://localhost/fyyur_bench python bench/venue_areas.py --venues 50000 --cities 3000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from itertools import groupby
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects.postgresql import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, Venue  # noqa: E402
+from queries import venue_areas  # noqa: E402
+import areas  # noqa: E402
+
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL']
+
+
+def load(n, cities, rng, batch_size=5000):
+    rows = []
+    for i in range(n):
+        rows.append({
+            'name': 'Bench Venue %d' % i,
+            'city': 'City %d' % rng.randrange(cities),
+            'state': rng.choice(STATES),
+            'address': '%d Main St' % i,
+            'genres': ['Jazz'],
+            'upcoming_shows_count': rng.randrange(10)
+        })
+        if len(rows) == batch_size:
+            db.session.execute(insert(Venue).values(rows))
+            rows = []
+    if rows:
+        db.session.execute(insert(Venue).values(rows))
+    db.session.commit()
+
+
+def python_grouping():
+    rows = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_shows_count)\
+        .order_by(Venue.city, Venue.state, Venue.id)\
+        .yield_per(1000)
+    return [{
+        'city': city,
+        'state': state,
+        'venues': [{'id': v.id, 'name': v.name, 'num_upcoming_shows': v.upcoming_shows_count} for v in venues]
+    } for (city, state), venues in groupby(rows, key=lambda r: (r.city, r.state))]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        db.session.rollback()
+    return {
+        'median_ms': round(statistics.median(samples) * 1000, 2),
+        'min_ms': round(min(samples) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=50000)
+    parser.add_argument('--cities', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--skip-load', action='store_true', help='reuse venues already in the database')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.skip_load:
+            load(args.venues, args.cities, random.Random(args.seed))
+        report = {
+            'venues': db.session.query(Venue).count(),
+            'refresh': timed(areas.refresh, max(1, args.repeat // 5)),
+            'python_grouping': timed(python_grouping, args.repeat),
+            'materialized_view': timed(lambda: venue_areas(), args.repeat)
+        }
+        report['areas'] = len(venue_areas())
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
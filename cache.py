@@ -0,0 +1,269 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from flask import current_app, g, request, session, make_response
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from models import db, CacheTag
+
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+class LRUCache:
+    # In-process cache bounded by entry count, with a per-entry TTL. Every key
+    # can carry tags so writes can drop exactly the pages they affect.
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires, tags = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    # Shared cache for multi-worker deployments. Only get/set/delete/expire,
+    # the set commands sadd/smembers and scan_iter are used, so any
+    # Redis-compatible client (or a local fake) can be passed in. Pages and
+    # tag sets both expire after ttl; eviction is left to the server.
+
+    def __init__(self, client, ttl=60, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + 'page:' + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, tags=()):
+        self.client.set(self.prefix + 'page:' + key, value, ex=self.ttl)
+        for tag in tags:
+            # A tag set outlives its newest page by at most ttl, so tags that
+            # are never invalidated do not pile up on the server.
+            tag_key = self.prefix + 'tag:' + tag
+            self.client.sadd(tag_key, key)
+            self.client.expire(tag_key, self.ttl)
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self.client.smembers(tag_key)
+            for key in keys:
+                key = key.decode() if isinstance(key, bytes) else key
+                self.client.delete(self.prefix + 'page:' + key)
+            self.client.delete(tag_key)
+
+    def clear(self):
+        # Only this cache's keys: the server may be shared with other prefixes.
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': None
+        }
+
+
+def make_backend(config, client_factory=None):
+    # client_factory(url) builds the Redis client; it defaults to
+    # CACHE_REDIS_CLIENT, then to redis-py, which is only imported here.
+    if config['CACHE_BACKEND'] == 'redis':
+        client_factory = client_factory or config.get('CACHE_REDIS_CLIENT')
+        if client_factory is None:
+            import redis
+            client_factory = redis.Redis.from_url
+        return RedisCache(client_factory(config['CACHE_REDIS_URL']), ttl=config['CACHE_TTL'])
+    return LRUCache(maxsize=config['CACHE_MAXSIZE'], ttl=config['CACHE_TTL'])
+
+
+#----------------------------------------------------------------------------#
+# Response caching.
+#----------------------------------------------------------------------------#
+
+class PageCache:
+    # Extension-style front for the configured backend, bound in create_app().
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app, client_factory=None):
+        self.backend = make_backend(app.config, client_factory)
+        app.extensions['page_cache'] = self
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, tags=()):
+        self.backend.set(key, value, tags)
+
+    def invalidate(self, *tags):
+        self.backend.invalidate(*tags)
+
+    def stats(self):
+        return self.backend.stats()
+
+cache = PageCache()
+
+def cache_enabled():
+    # Skipped entirely (no read, no write) when caching is switched off, when the
+    # client asks for ?nocache=1 or sends Cache-Control: no-cache, and while the
+    # session holds flashed messages that the rendered page would consume.
+    return current_app.config['CACHE_ENABLED'] \
+        and request.method == 'GET' \
+        and not request.args.get('nocache') \
+        and 'no-cache' not in request.headers.get('Cache-Control', '') \
+        and '_flashes' not in session
+
+def cached(*tags):
+    # Caches the rendered page of a view under its full path and, behind
+    # conditional(), its ETag: a page rendered before another process bumped
+    # the tags is never served under the new versions. Tags may refer to the
+    # view's URL arguments, e.g. cached('venue:{venue_id}').
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not cache_enabled():
+                return f(*args, **kwargs)
+            key = request.full_path + '#' + g.get('etag', '')
+            body = cache.get(key)
+            if body is not None:
+                return body
+            rv = f(*args, **kwargs)
+            if isinstance(rv, str):
+                cache.set(key, rv, [tag.format(**kwargs) for tag in tags])
+            return rv
+        return wrapper
+    return decorator
+
+def invalidate(*tags):
+    # Call after the write commits. Bumping the versions in the database is
+    # what reaches other processes and workers; dropping the local pages
+    # just frees their memory early. Tags are bumped in sorted order so
+    # concurrent writers never lock the rows in opposite orders.
+    tags = sorted(set(tags))
+    if not tags:
+        return
+    stmt = insert(CacheTag).values([{'tag': tag} for tag in tags])
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['tag'], set_={
+        'version': CacheTag.version + 1,
+        'updated_at': func.timezone('utc', func.now())
+    }))
+    db.session.commit()
+    cache.invalidate(*tags)
+
+
+#----------------------------------------------------------------------------#
+# Conditional requests.
+#----------------------------------------------------------------------------#
+
+def conditional(*tags):
+    # Answers 304 Not Modified before the view does any heavy loading when the
+    # client's If-None-Match / If-Modified-Since still matches. The ETag is a
+    # hash of the path and the versions of the page's tags (formatted like
+    # cached()'s), and Last-Modified is the latest bump among them, so both
+    # move on every invalidate(). Shows passing from upcoming to past count
+    # as a write once `flask counters roll` moves them.
+    # queries is imported here, as the views are decorated, rather than with
+    # this module: app.py imports cache, and the query layer loads with the
+    # views once an app is built.
+    from queries import tag_versions
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            names = [tag.format(**kwargs) for tag in tags]
+            versions = tag_versions(names)
+            etag = hashlib.md5(repr((request.full_path, [versions.get(n, (0,))[0] for n in names])).encode()).hexdigest()
+            g.etag = etag
+            bumped = [updated_at for _, updated_at in versions.values()]
+            last_modified = max(bumped).replace(microsecond=0, tzinfo=timezone.utc) if bumped else None
+
+            # If-Modified-Since is only a fallback for clients that send no
+            # ETag; it has one-second resolution.
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified is not None \
+                    and last_modified <= since.replace(tzinfo=timezone.utc)
+
+            response = make_response(('', 304) if not_modified else f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
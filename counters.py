@@ -0,0 +1,141 @@
+import sys
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, or_, select, update
+from models import db, Venue, Artist, Show
+from cache import invalidate
+import areas
+
+# (model, Show foreign key, cache tag prefix)
+ENTITIES = (
+    (Venue, Show.venue_id, 'venue'),
+    (Artist, Show.artist_id, 'artist')
+)
+COUNTERS = ('upcoming_shows_count', 'past_shows_count', 'next_show_time')
+
+
+#----------------------------------------------------------------------------#
+# Recounting.
+#----------------------------------------------------------------------------#
+
+def _counted(model, show_key, now):
+    # Correlated subqueries that recompute every counter of one row; each is
+    # answered from the (<entity>_id, start_time) index.
+    mine = show_key == model.id
+    return {
+        'upcoming_shows_count': select(func.count(Show.id)).where(mine, Show.start_time > now).scalar_subquery(),
+        'past_shows_count': select(func.count(Show.id)).where(mine, Show.start_time <= now).scalar_subquery(),
+        'next_show_time': select(func.min(Show.start_time)).where(mine, Show.start_time > now).scalar_subquery()
+    }
+
+def _show_key(model):
+    return next(key for m, key, _ in ENTITIES if m is model)
+
+def recount(model, ids=None, now=None):
+    # Recomputes the counters of the given rows (every row when ids is None)
+    # inside the caller's transaction.
+    now = now or datetime.now()
+    stmt = update(model).values(**_counted(model, _show_key(model), now))
+    if ids is not None:
+        if not ids:
+            return 0
+        stmt = stmt.where(model.id.in_(ids))
+    return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+#----------------------------------------------------------------------------#
+# Incremental maintenance.
+#----------------------------------------------------------------------------#
+
+def show_added(venue_id, artist_id, start_time, now=None):
+    # Bumps the venue's and artist's counters for one new show, in the same
+    # transaction as the insert.
+    now = now or datetime.now()
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+        if start_time > now:
+            values = {
+                'upcoming_shows_count': model.upcoming_shows_count + 1,
+                'next_show_time': func.least(model.next_show_time, start_time)
+            }
+        else:
+            values = {'past_shows_count': model.past_shows_count + 1}
+        db.session.execute(update(model).where(model.id == entity_id).values(**values)
+                           .execution_options(synchronize_session=False))
+
+def roll_forward(now=None):
+    # Shows only move from upcoming to past, and a row's counters can only go
+    # stale once its next_show_time has passed, so just those rows are
+    # recounted. Returns the cache tags of the rows that changed.
+    now = now or datetime.now()
+    tags = []
+    for model, show_key, prefix in ENTITIES:
+        rows = db.session.execute(
+            update(model)
+            .where(model.next_show_time <= now)
+            .values(**_counted(model, show_key, now))
+            .returning(model.id)
+            .execution_options(synchronize_session=False))
+        tags.extend('%s:%d' % (prefix, entity_id) for entity_id, in rows)
+    return tags
+
+
+#----------------------------------------------------------------------------#
+# Consistency checks.
+#----------------------------------------------------------------------------#
+
+def drift(model, now=None):
+    # Rows whose stored counters differ from a from-scratch recount, as
+    # (id, stored, expected) tuples.
+    now = now or datetime.now()
+    expected = _counted(model, _show_key(model), now)
+    rows = db.session.query(
+            model.id,
+            *[getattr(model, name) for name in COUNTERS],
+            *[expected[name].label('expected_' + name) for name in COUNTERS]
+        )\
+        .filter(or_(*[getattr(model, name).is_distinct_from(expected[name]) for name in COUNTERS]))\
+        .order_by(model.id)\
+        .all()
+    size = len(COUNTERS)
+    return [(r[0], r[1:1 + size], r[1 + size:]) for r in rows]
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+counters_command = AppGroup('counters', help='Maintain the denormalized show counters.')
+
+@counters_command.command('roll')
+def roll_command():
+    """Move passed shows from upcoming to past. Run this periodically, e.g. from cron every minute."""
+    tags = roll_forward()
+    db.session.commit()
+    if tags:
+        # Upcoming /shows pages change along with the rolled rows.
+        invalidate('venues', 'shows', *tags)
+        areas.refresh()
+    click.echo('%d rows rolled forward' % len(tags))
+
+@counters_command.command('check')
+@click.option('--fix', is_flag=True, help='Rewrite drifted rows with the recounted values.')
+def check_command(fix):
+    """Recount every venue and artist from scratch and report drift."""
+    now = datetime.now()
+    tags = []
+    for model, _, prefix in ENTITIES:
+        rows = drift(model, now)
+        for entity_id, stored, expected in rows:
+            click.echo('%s %d: stored %s, expected %s' % (prefix, entity_id, tuple(stored), tuple(expected)))
+        if fix and rows:
+            recount(model, [r[0] for r in rows], now)
+        tags.extend('%s:%d' % (prefix, r[0]) for r in rows)
+    click.echo('%d rows drifted%s' % (len(tags), ', fixed' if fix and tags else ''))
+    if not tags:
+        return
+    if not fix:
+        sys.exit(1)
+    db.session.commit()
+    invalidate('venues', *tags)
+    areas.refresh()
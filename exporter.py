@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from models import Venue, Artist
+from queries import SHOW_COLUMNS, model_columns, entity_stream, show_stream
+
+FORMATS = ('csv', 'jsonl', 'columnar')
+CHUNK_ROWS = 10000
+
+
+#----------------------------------------------------------------------------#
+# Row sources.
+#----------------------------------------------------------------------------#
+
+def export_rows(kind, date_from=None, date_to=None, city=None, state=None):
+    # All sources read through server-side cursors (yield_per), so memory use
+    # does not grow with table size.
+    if kind == 'shows':
+        fields = tuple(SHOW_COLUMNS)
+        return fields, show_stream(date_from=date_from, date_to=date_to, fields=fields)
+    model = Venue if kind == 'venues' else Artist
+    fields = tuple(model_columns(model))
+    return fields, entity_stream(model, fields, city=city, state=state)
+
+
+#----------------------------------------------------------------------------#
+# Encoders.
+#----------------------------------------------------------------------------#
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_value(value):
+    # Arrays use the same ';'-separated form the importer reads.
+    if isinstance(value, list):
+        return ';'.join(map(str, value))
+    return _value(value)
+
+def encode_csv(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_csv_value(row[f]) for f in fields])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_jsonl(fields, rows):
+    for row in rows:
+        yield json.dumps({f: _value(row[f]) for f in fields}) + '\n'
+
+def encode_columnar(fields, rows):
+    # Column-major chunks of up to CHUNK_ROWS rows, one JSON document per line:
+    # {"rows": n, "columns": {"id": [...], "name": [...]}}
+    def flush(columns, n):
+        return json.dumps({'rows': n, 'columns': columns}) + '\n'
+    columns, n = {f: [] for f in fields}, 0
+    for row in rows:
+        for f in fields:
+            columns[f].append(_value(row[f]))
+        n += 1
+        if n == CHUNK_ROWS:
+            yield flush(columns, n)
+            columns, n = {f: [] for f in fields}, 0
+    if n:
+        yield flush(columns, n)
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+    'columnar': encode_columnar
+}
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export(kind, format, compress=False, **filters):
+    fields, rows = export_rows(kind, **filters)
+    chunks = ENCODERS[format](fields, rows)
+    return gzipped(chunks) if compress else (chunk.encode() for chunk in chunks)
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['artists', 'shows', 'venues']))
+@click.option('--format', 'format', type=click.Choice(FORMATS), default='csv')
+@click.option('--output', '-o', default='-', help='Output file; defaults to stdout.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output as it is written.')
+@click.option('--from', 'date_from', type=click.DateTime(['%Y-%m-%d']), help='Shows starting on or after.')
+@click.option('--to', 'date_to', type=click.DateTime(['%Y-%m-%d']), help='Shows starting before.')
+@click.option('--city', help='Venues/artists in this city.')
+@click.option('--state', help='Venues/artists in this state.')
+@with_appcontext
+def export_command(kind, format, output, compress, date_from, date_to, city, state):
+    """Stream venues, artists or shows out as CSV, JSONL or columnar chunks."""
+    with click.open_file(output, 'wb') as out:
+        for chunk in export(kind, format, compress, date_from=date_from, date_to=date_to, city=city, state=state):
+            out.write(chunk)
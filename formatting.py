@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma"
+}
+
+
+#----------------------------------------------------------------------------#
+# Datetime formatting.
+#----------------------------------------------------------------------------#
+
+# babel and dateutil are imported on first use so that importing the app
+# (every worker, every CLI call) does not pay for them up front.
+
+@lru_cache(maxsize=None)
+def _pattern(format):
+    import babel.dates
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+
+@lru_cache(maxsize=None)
+def _locale(name):
+    import babel
+    return babel.Locale.parse(name)
+
+@lru_cache(maxsize=4096)
+def _format(value, format, locale):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return _pattern(format).apply(value, _locale(locale))
+
+def format_datetime(value, format='medium', locale='en'):
+    # Takes datetime objects directly; strings are still accepted and parsed
+    # for callers that only have a serialized timestamp.
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format(value, format, locale)
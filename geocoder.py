@@ -0,0 +1,86 @@
+import csv
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, update
+from models import db, Venue
+
+
+#----------------------------------------------------------------------------#
+# Lookup file.
+#----------------------------------------------------------------------------#
+
+def _key(*parts):
+    # Case- and whitespace-insensitive, so 'new  york' matches 'New York'.
+    return tuple(' '.join((p or '').split()).lower() for p in parts)
+
+def load_lookup(path):
+    # A local CSV with city,state,latitude,longitude columns and an optional
+    # address column. Rows with an address pin that street address; rows
+    # without one give the city's centre. Nothing is fetched over the network.
+    addresses, cities = {}, {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = float(row['latitude']), float(row['longitude'])
+            if row.get('address'):
+                addresses[_key(row['address'], row['city'], row['state'])] = point
+            else:
+                cities[_key(row['city'], row['state'])] = point
+    return addresses, cities
+
+
+#----------------------------------------------------------------------------#
+# Geocoding.
+#----------------------------------------------------------------------------#
+
+def geocode(lookup, overwrite=False, batch_size=1000):
+    # Matches venues against the lookup (street address first, then city)
+    # and writes the coordinates back in executemany batches. Venues already
+    # geocoded are skipped unless overwrite is set.
+    addresses, cities = lookup
+    query = db.session.query(Venue.id, Venue.address, Venue.city, Venue.state).order_by(Venue.id)
+    if not overwrite:
+        query = query.filter(Venue.latitude.is_(None))
+    venues = query.all()
+
+    stmt = update(Venue.__table__)\
+        .where(Venue.id == bindparam('venue_id'))\
+        .values(latitude=bindparam('lat'), longitude=bindparam('lng'))
+    report = {'address': 0, 'city': 0, 'unmatched': 0}
+    batch = []
+    for v in venues:
+        point = addresses.get(_key(v.address, v.city, v.state))
+        if point:
+            report['address'] += 1
+        else:
+            point = cities.get(_key(v.city, v.state))
+            if point is None:
+                report['unmatched'] += 1
+                continue
+            report['city'] += 1
+        batch.append({'venue_id': v.id, 'lat': point[0], 'lng': point[1]})
+        if len(batch) == batch_size:
+            db.session.execute(stmt, batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        db.session.execute(stmt, batch)
+    db.session.commit()
+    return report
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+geocode_command = AppGroup('geocode', help='Offline geocoding of venues.')
+
+@geocode_command.command('venues')
+@click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--overwrite', is_flag=True, help='Re-geocode venues that already have coordinates.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def venues_command(path, overwrite, batch_size):
+    """Fill in venue coordinates from PATH (default GEOCODER_LOOKUP_FILE)."""
+    path = path or current_app.config['GEOCODER_LOOKUP_FILE']
+    report = geocode(load_lookup(path), overwrite, batch_size)
+    click.echo('%(address)d by address, %(city)d by city, %(unmatched)d unmatched' % report)
@@ -0,0 +1,70 @@
+PRODID = '-//Fyyur//Show calendar//EN'
+
+
+#----------------------------------------------------------------------------#
+# iCalendar (RFC 5545) encoding.
+#----------------------------------------------------------------------------#
+
+def _escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _fold(line):
+    # Content lines are at most 75 octets; longer ones continue on lines that
+    # start with a space. Cuts never split a UTF-8 sequence.
+    raw = line.encode('utf-8')
+    out, limit = [], 75
+    while len(raw) > limit:
+        cut = limit
+        while raw[cut] & 0xC0 == 0x80:
+            cut -= 1
+        out.append(raw[:cut])
+        raw = raw[cut:]
+        limit = 74
+    out.append(raw)
+    return b'\r\n '.join(out).decode('utf-8') + '\r\n'
+
+def _local(value):
+    # Show times are stored without a zone, so they go out as floating
+    # times: the wall-clock time at the venue.
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def _utc(value):
+    # updated_at columns hold naive UTC.
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def _event(show, base_url, host):
+    location = ', '.join(p for p in (show.venue_address, show.venue_city, show.venue_state) if p)
+    lines = [
+        'BEGIN:VEVENT',
+        'UID:show-%d@%s' % (show.id, host),
+        'DTSTAMP:' + _utc(show.updated_at),
+        'DTSTART:' + _local(show.start_time),
+        'DTEND:' + _local(show.end_time),
+        'SUMMARY:' + _escape('%s at %s' % (show.artist_name, show.venue_name)),
+        'LOCATION:' + _escape(location),
+        'URL:%svenues/%d' % (base_url, show.venue_id),
+        'END:VEVENT'
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+def calendar(name, shows, base_url, host):
+    # Yields the calendar piece by piece as shows come off the cursor; events
+    # are buffered into chunks of about 16 KB rather than one write each.
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:' + PRODID,
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:' + _escape(name)
+    ))
+    chunk = []
+    size = 0
+    for show in shows:
+        event = _event(show, base_url, host)
+        chunk.append(event)
+        size += len(event)
+        if size >= 16 * 1024:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    chunk.append('END:VCALENDAR\r\n')
+    yield ''.join(chunk)
@@ -0,0 +1,208 @@
+import csv
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import exc, text
+from sqlalchemy.dialects.postgresql import insert
+from werkzeug.datastructures import MultiDict
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, SHOW_DEFAULT_DURATION
+from queries import booking_conflicts
+from cache import invalidate
+import counters
+import areas
+
+KINDS = {
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'shows': (Show, ShowForm)
+}
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+# SQLSTATE raised when an insert violates an exclusion constraint.
+EXCLUSION_VIOLATION = '23P01'
+
+
+#----------------------------------------------------------------------------#
+# Reading.
+#----------------------------------------------------------------------------#
+
+def read_rows(stream, format):
+    # Yields (line number, dict) pairs one at a time from a text stream.
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Multi-valued CSV cells (genres) are ';'-separated.
+            if row.get('genres'):
+                row['genres'] = [g.strip() for g in row['genres'].split(';') if g.strip()]
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+    else:
+        raise ValueError('Unsupported format: %s' % format)
+
+def formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None or value == '':
+            continue
+        if key in BOOLEAN_FIELDS:
+            if str(value).lower() in ('1', 'true', 'yes', 'y'):
+                data.add(key, 'y')
+        elif isinstance(value, list):
+            for item in value:
+                data.add(key, item)
+        else:
+            data.add(key, str(value))
+    return data
+
+
+#----------------------------------------------------------------------------#
+# Validation and loading.
+#----------------------------------------------------------------------------#
+
+def validate(model, form_class, row):
+    # Runs the same rules as the HTML forms and returns (values, errors).
+    form = form_class(formdata=formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    columns = model.__table__.columns.keys()
+    values = {k: v for k, v in form.data.items() if k in columns}
+    if 'website' in columns and form.data.get('website_link'):
+        values['website'] = form.data['website_link']
+    if model is Show:
+        if values.get('end_time') is None:
+            # Let the model default the end from start_time.
+            values.pop('end_time', None)
+        try:
+            values['venue_id'] = int(values['venue_id'])
+            values['artist_id'] = int(values['artist_id'])
+        except (TypeError, ValueError):
+            return None, {'venue_id/artist_id': ['must be integers']}
+    if row.get('id') not in (None, ''):
+        try:
+            values['id'] = int(row['id'])
+        except ValueError:
+            return None, {'id': ['must be an integer']}
+    return values, None
+
+def _clash(values):
+    # The shows an imported show double-books, as the show form lists them.
+    start_time = values['start_time']
+    end_time = values.get('end_time') or start_time + SHOW_DEFAULT_DURATION
+    conflicts = booking_conflicts(values['venue_id'], values['artist_id'], start_time, end_time)
+    return {
+        'errors': 'the venue or artist is already booked at that time (show %s)'
+                  % ', '.join(str(c['id']) for c in conflicts),
+        'conflicts': conflicts
+    }
+
+def load_batch(model, batch, report):
+    # One multi-row INSERT ... ON CONFLICT (id) DO NOTHING per batch, so rows
+    # whose id already exists are skipped. If the batch violates any other
+    # constraint (a show pointing at a missing venue, or double-booking a
+    # venue or artist), it is retried row by row inside savepoints so only
+    # the bad rows are reported. Multi-row VALUES needs the same keys on
+    # every row, and optional columns such as an explicit id may differ, so
+    # rows are grouped by their key set.
+    groups = {}
+    for _, values in batch:
+        groups.setdefault(frozenset(values), []).append(values)
+    try:
+        with db.session.begin_nested():
+            results = [db.session.execute(insert(model).values(rows).on_conflict_do_nothing(index_elements=['id']))
+                       for rows in groups.values()]
+        inserted = sum(r.rowcount for r in results)
+        report['inserted'] += inserted
+        report['skipped'] += len(batch) - inserted
+        return
+    except (exc.IntegrityError, exc.DataError):
+        pass
+    for line, row in batch:
+        try:
+            with db.session.begin_nested():
+                result = db.session.execute(insert(model).values(row).on_conflict_do_nothing(index_elements=['id']))
+            report['inserted'] += result.rowcount
+            report['skipped'] += 1 - result.rowcount
+        except (exc.IntegrityError, exc.DataError) as e:
+            if getattr(e.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+                report['errors'].append(dict(_clash(row), line=line))
+            else:
+                report['errors'].append({'line': line, 'errors': str(e.orig).strip()})
+
+def import_rows(kind, rows, batch_size=None):
+    model, form_class = KINDS[kind]
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    report = {'kind': kind, 'inserted': 0, 'skipped': 0, 'errors': []}
+    explicit_ids = False
+    stale = set()
+    touched = {Venue: set(), Artist: set()}
+    batch = []
+
+    for line, row in rows:
+        if isinstance(row, Exception):
+            report['errors'].append({'line': line, 'errors': str(row)})
+            continue
+        values, errors = validate(model, form_class, row)
+        if errors:
+            report['errors'].append({'line': line, 'errors': errors})
+            continue
+        explicit_ids = explicit_ids or 'id' in values
+        if model is Show:
+            stale.update(('venue:%d' % values['venue_id'], 'artist:%d' % values['artist_id']))
+            touched[Venue].add(values['venue_id'])
+            touched[Artist].add(values['artist_id'])
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            load_batch(model, batch, report)
+            db.session.commit()
+            batch = []
+
+    if batch:
+        load_batch(model, batch, report)
+    if explicit_ids:
+        # Keep the serial sequence ahead of imported ids.
+        table = model.__tablename__
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), COALESCE(MAX(id), 1)) FROM \"%s\"" % (table, table)))
+    for entity, ids in touched.items():
+        # One recount per touched venue/artist rather than per imported show.
+        counters.recount(entity, ids)
+    if model in (Venue, Show) and report['inserted']:
+        areas.schedule_refresh()
+    db.session.commit()
+
+    invalidate(kind, *stale)
+    if model is Show:
+        invalidate('venues')
+    return report
+
+def import_stream(kind, stream, format, batch_size=None):
+    return import_rows(kind, read_rows(stream, format), batch_size)
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; defaults to the file extension.')
+@click.option('--batch-size', type=int, help='Rows per INSERT statement.')
+@with_appcontext
+def import_command(kind, path, format, batch_size):
+    """Bulk-load venues, artists or shows from a CSV or JSONL file."""
+    format = format or ('csv' if path.endswith('.csv') else 'jsonl')
+    with click.open_file(path, encoding='utf-8', newline='') as stream:
+        report = import_stream(kind, stream, format, batch_size)
+    for error in report['errors']:
+        click.echo('line %s: %s' % (error['line'], error['errors']), err=True)
+    click.echo('%s: %d inserted, %d skipped, %d rejected' % (
+        kind, report['inserted'], report['skipped'], len(report['errors'])))
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, request, has_request_context, Response
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import pool
+
+logger = logging.getLogger(__name__)
+
+
+#----------------------------------------------------------------------------#
+# Per-request recording.
+#----------------------------------------------------------------------------#
+
+def _stats():
+    if not has_request_context():
+        return None
+    if 'sql_stats' not in g:
+        g.sql_stats = {
+            'count': 0,
+            'db_time': 0.0,
+            'template_time': 0.0,
+            'statements': [],
+            'shapes': Counter()
+        }
+    return g.sql_stats
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_start')
+    stats = _stats()
+    if stats is None:
+        return
+    stats['count'] += 1
+    stats['db_time'] += elapsed
+    # Statements are already parameterized, so the text itself is the shape.
+    stats['shapes'][statement] += 1
+    stats['statements'].append((elapsed, statement))
+
+
+class TimedTemplate(Template):
+    # Only the outermost render() is called per page; extends/includes are
+    # rendered inside it, so this captures the whole template time.
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats = _stats()
+            if stats is not None:
+                stats['template_time'] += time.perf_counter() - start
+
+
+#----------------------------------------------------------------------------#
+# Aggregates.
+#----------------------------------------------------------------------------#
+
+_lock = threading.Lock()
+_totals = Counter()
+_collectors = []
+
+def register_collector(collector):
+    # collector() returns (name, type, help, value) tuples appended to /_metrics.
+    _collectors.append(collector)
+
+register_collector(pool.collect)
+
+def slowest_statements(stats, n=5):
+    return sorted(stats['statements'], key=lambda s: s[0], reverse=True)[:n]
+
+def n_plus_one(stats):
+    threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+    return [(shape, n) for shape, n in stats['shapes'].items() if n > threshold]
+
+def start_timer():
+    g.request_start = time.perf_counter()
+
+def record_request(response):
+    stats = _stats()
+    total = time.perf_counter() - g.get('request_start', time.perf_counter())
+    repeated = n_plus_one(stats)
+    for shape, n in repeated:
+        logger.warning('Possible N+1 on %s: statement repeated %d times: %s', request.path, n, shape)
+    # Statements over SLOW_STATEMENT_MS are logged at the same level as N+1
+    # shapes, so they show up at normal log levels; the rest stay at debug.
+    threshold = current_app.config['SLOW_STATEMENT_MS'] / 1000.0
+    slow = sum(1 for elapsed, _ in stats['statements'] if elapsed >= threshold)
+    slowest = slowest_statements(stats)
+    for elapsed, statement in slowest:
+        if elapsed >= threshold:
+            logger.warning('Slow statement on %s: %.1fms %s', request.path, elapsed * 1000, statement)
+        else:
+            logger.debug('%s %.1fms %s', request.path, elapsed * 1000, statement)
+
+    response.headers['Server-Timing'] = \
+        'db;dur=%.1f;desc="%d statements", slowest;dur=%.1f, tpl;dur=%.1f, total;dur=%.1f' % (
+            stats['db_time'] * 1000, stats['count'], slowest[0][0] * 1000 if slowest else 0.0,
+            stats['template_time'] * 1000, total * 1000)
+
+    with _lock:
+        _totals['requests'] += 1
+        _totals['statements'] += stats['count']
+        _totals['db_seconds'] += stats['db_time']
+        _totals['template_seconds'] += stats['template_time']
+        _totals['request_seconds'] += total
+        _totals['n_plus_one'] += len(repeated)
+        _totals['slow_statements'] += slow
+    return response
+
+
+def render_metrics():
+    with _lock:
+        totals = dict(_totals)
+    lines = []
+    samples = [
+        ('fyyur_requests_total', 'counter', 'Requests served.', totals.get('requests', 0)),
+        ('fyyur_db_statements_total', 'counter', 'SQL statements executed during requests.', totals.get('statements', 0)),
+        ('fyyur_db_seconds_total', 'counter', 'Time spent executing SQL during requests.', totals.get('db_seconds', 0.0)),
+        ('fyyur_template_seconds_total', 'counter', 'Time spent rendering templates.', totals.get('template_seconds', 0.0)),
+        ('fyyur_request_seconds_total', 'counter', 'Wall time spent serving requests.', totals.get('request_seconds', 0.0)),
+        ('fyyur_n_plus_one_total', 'counter', 'Requests flagged with a repeated statement shape.', totals.get('n_plus_one', 0)),
+        ('fyyur_slow_statements_total', 'counter', 'Statements slower than SLOW_STATEMENT_MS during requests.',
+         totals.get('slow_statements', 0))
+    ]
+    for collector in _collectors:
+        samples.extend(collector())
+    for name, kind, help, value in samples:
+        lines.append('# HELP %s %s' % (name, help))
+        lines.append('# TYPE %s %s' % (name, kind))
+        lines.append('%s %s' % (name, value))
+    return '\n'.join(lines) + '\n'
+
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    if app.config['METRICS_ENABLED']:
+        app.add_url_rule('/_metrics', 'metrics', metrics)
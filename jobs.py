@@ -0,0 +1,209 @@
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from models import db, Job
+
+# kind -> callable taking the job payload as keyword arguments
+HANDLERS = {}
+
+
+def _now():
+    # The database clock, in the naive UTC the Job columns hold.
+    return func.timezone('utc', func.now())
+
+def handler(kind):
+    # Registers f to run jobs of this kind. Jobs are delivered at least once
+    # (a worker can die after the work but before marking it done), so
+    # handlers must be safe to run again.
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+
+#----------------------------------------------------------------------------#
+# Enqueueing.
+#----------------------------------------------------------------------------#
+
+def enqueue(kind, payload=None, key=None, delay=0, max_attempts=None):
+    # Queues a job in the caller's transaction, so workers only see it once
+    # the write that asked for it commits, and never if that rolls back.
+    # key is an idempotency key: while a job with the same key exists, further
+    # enqueues are no-ops.
+    if kind not in HANDLERS:
+        raise ValueError('Unknown job kind: %s' % kind)
+    stmt = insert(Job).values(
+        kind=kind,
+        payload=payload or {},
+        idempotency_key=key,
+        run_at=_now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS']
+    )
+    if key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['idempotency_key'])
+    db.session.execute(stmt)
+
+
+#----------------------------------------------------------------------------#
+# Running.
+#----------------------------------------------------------------------------#
+
+def claim(worker, kinds=None):
+    # Takes the oldest due job. FOR UPDATE SKIP LOCKED lets many workers poll
+    # the same table: each passes over rows another worker is claiming
+    # instead of queueing behind its lock, so no job is handed out twice and
+    # nobody waits. The claim is committed straight away; the row lock is
+    # only held for this statement.
+    due = select(Job.id)\
+        .where(Job.status == 'queued', Job.run_at <= _now())
+    if kinds:
+        due = due.where(Job.kind.in_(kinds))
+    due = due.order_by(Job.run_at, Job.id)\
+        .limit(1)\
+        .with_for_update(skip_locked=True)\
+        .scalar_subquery()
+    job = db.session.execute(
+        update(Job)
+        .where(Job.id == due)
+        .values(status='running', attempts=Job.attempts + 1, locked_at=_now(), locked_by=worker)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return job
+
+def backoff(attempts):
+    # Exponential, capped, with jitter so failed jobs do not retry in lockstep.
+    base = current_app.config['JOB_BACKOFF_BASE']
+    delay = min(base * 2 ** (attempts - 1), current_app.config['JOB_BACKOFF_MAX'])
+    return random.uniform(delay / 2, delay)
+
+def _finish(job_id, **values):
+    db.session.execute(update(Job).where(Job.id == job_id).values(locked_at=None, locked_by=None, **values))
+    db.session.commit()
+
+def run(job):
+    # Runs one claimed job and records the outcome: done, queued again after
+    # a backoff, or failed once max_attempts is used up.
+    try:
+        HANDLERS[job.kind](**job.payload)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        current_app.logger.warning('job %d (%s) attempt %d failed', job.id, job.kind, job.attempts)
+        if job.attempts >= job.max_attempts:
+            _finish(job.id, status='failed', last_error=error, finished_at=_now())
+        else:
+            _finish(job.id, status='queued', last_error=error,
+                    run_at=_now() + timedelta(seconds=backoff(job.attempts)))
+        return False
+    _finish(job.id, status='done', finished_at=_now())
+    return True
+
+def reclaim():
+    # Jobs whose worker died mid-run are still 'running'; once their lock is
+    # older than JOB_LOCK_TIMEOUT they count as a failed attempt.
+    timeout = timedelta(seconds=current_app.config['JOB_LOCK_TIMEOUT'])
+    exhausted = Job.attempts >= Job.max_attempts
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_at < _now() - timeout)
+        .values(
+            status=case((exhausted, 'failed'), else_='queued'),
+            finished_at=case((exhausted, _now()), else_=None),
+            last_error='Worker stopped responding',
+            locked_at=None,
+            locked_by=None
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return count
+
+def work(app, worker, stop, kinds=None, once=False):
+    # One worker thread: claim and run jobs until stop is set, or until no job
+    # is due when once is set.
+    with app.app_context():
+        poll = app.config['JOB_POLL_INTERVAL']
+        while not stop.is_set():
+            try:
+                job = claim(worker, kinds)
+                if job is not None:
+                    run(job)
+                    continue
+                if once:
+                    return
+                reclaim()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('worker %s: polling failed', worker)
+            finally:
+                db.session.remove()
+            stop.wait(poll)
+
+
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+@click.command('worker')
+@click.option('--concurrency', type=int, help='Worker threads; defaults to JOB_CONCURRENCY.')
+@click.option('--kind', 'kinds', multiple=True, help='Only run jobs of this kind (repeatable).')
+@click.option('--once', is_flag=True, help='Run every job that is due, then exit.')
+@with_appcontext
+def worker_command(concurrency, kinds, once):
+    """Run queued background jobs. SIGINT/SIGTERM stop after the jobs in hand."""
+    app = current_app._get_current_object()
+    concurrency = concurrency or app.config['JOB_CONCURRENCY']
+    stop = threading.Event()
+    name = '%s:%d' % (socket.gethostname(), os.getpid())
+    threads = [threading.Thread(target=work, args=(app, '%s:%d' % (name, i), stop, kinds, once))
+               for i in range(concurrency)]
+
+    def shutdown(signum, frame):
+        click.echo('stopping after the jobs in hand')
+        stop.set()
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for t in threads:
+        t.start()
+    # join with a timeout so the main thread keeps handling signals
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(0.5)
+
+jobs_command = AppGroup('jobs', help='Inspect and prune the background job queue.')
+
+@jobs_command.command('status')
+def status_command():
+    """Jobs per kind and status."""
+    rows = db.session.query(Job.kind, Job.status, func.count(Job.id))\
+        .group_by(Job.kind, Job.status)\
+        .order_by(Job.kind, Job.status)\
+        .all()
+    for kind, status, count in rows:
+        click.echo('%s %s: %d' % (kind, status, count))
+
+@jobs_command.command('purge')
+@click.option('--days', type=int, help='Keep finished jobs this recent; defaults to JOB_RETENTION_DAYS.')
+def purge_command(days):
+    """Delete finished jobs, freeing their idempotency keys. Suitable for a daily cron job."""
+    days = days if days is not None else current_app.config['JOB_RETENTION_DAYS']
+    count = db.session.execute(
+        delete(Job)
+        .where(Job.status.in_(('done', 'failed')), Job.finished_at < _now() - timedelta(days=days))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    click.echo('%d jobs deleted' % count)
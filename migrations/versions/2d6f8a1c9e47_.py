@@ -0,0 +1,38 @@
+"""Denormalized show counters on Venue and Artist
+
+Revision ID: 2d6f8a1c9e47
+Revises: e7c2a94b5d13
+Create Date: 2026-10-18 14:41:37.902615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d6f8a1c9e47'
+down_revision = 'e7c2a94b5d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        op.execute(
+            'UPDATE "{table}" e SET '
+            'upcoming_shows_count = (SELECT count(*) FROM "Show" s WHERE s.{key} = e.id AND s.start_time > now()), '
+            'past_shows_count = (SELECT count(*) FROM "Show" s WHERE s.{key} = e.id AND s.start_time <= now()), '
+            'next_show_time = (SELECT min(s.start_time) FROM "Show" s WHERE s.{key} = e.id AND s.start_time > now())'
+            .format(table=table, key=key))
+        op.create_index('ix_%s_next_show_time' % table.lower(), table, ['next_show_time'], unique=False)
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_%s_next_show_time' % table.lower(), table_name=table)
+        op.drop_column(table, 'next_show_time')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
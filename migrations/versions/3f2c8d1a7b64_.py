@@ -0,0 +1,29 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: 3f2c8d1a7b64
+Revises: ebe9524f7a0a
+Create Date: 2026-10-18 10:12:41.382104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2c8d1a7b64'
+down_revision = 'ebe9524f7a0a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_venue_name_trgm', table_name='Venue')
@@ -0,0 +1,62 @@
+"""Genre lookup table and GIN-indexed genre_ids on Venue and Artist
+
+Revision ID: 4b8d1e6a3c95
+Revises: 9c3e5b7d2f18
+Create Date: 2026-10-18 16:58:43.120577
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8d1e6a3c95'
+down_revision = '9c3e5b7d2f18'
+branch_labels = None
+depends_on = None
+
+# The vocabulary of the genres select in forms.py, in form order.
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+          'Rock n Roll', 'Soul', 'Other']
+
+
+def upgrade():
+    genre = op.create_table('Genre',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.bulk_insert(genre, [{'id': i, 'name': name} for i, name in enumerate(GENRES, 1)])
+    op.execute('SELECT setval(pg_get_serial_sequence(\'"Genre"\', \'id\'), %d)' % len(GENRES))
+
+    # genre_ids mirrors the genres names as Genre ids. A trigger keeps it in
+    # step with every write path (forms, bulk import, raw SQL); names not in
+    # the vocabulary are left out.
+    op.execute("""
+        CREATE FUNCTION fyyur_genre_ids() RETURNS trigger AS $$
+        BEGIN
+            NEW.genre_ids := ARRAY(SELECT id FROM "Genre" WHERE name = ANY(NEW.genres) ORDER BY id);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('genre_ids', postgresql.ARRAY(sa.Integer()), nullable=False,
+                                       server_default='{}'))
+        op.execute('CREATE TRIGGER %s_genre_ids BEFORE INSERT OR UPDATE OF genres ON "%s" '
+                   'FOR EACH ROW EXECUTE PROCEDURE fyyur_genre_ids()' % (table.lower(), table))
+        op.execute('UPDATE "%s" SET genres = genres' % table)
+        op.create_index('ix_%s_genre_ids' % table.lower(), table, ['genre_ids'], unique=False,
+                        postgresql_using='gin')
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_%s_genre_ids' % table.lower(), table_name=table)
+        op.execute('DROP TRIGGER %s_genre_ids ON "%s"' % (table.lower(), table))
+        op.drop_column(table, 'genre_ids')
+    op.execute('DROP FUNCTION fyyur_genre_ids()')
+    op.drop_table('Genre')
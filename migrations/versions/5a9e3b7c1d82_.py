@@ -0,0 +1,27 @@
+"""updated_at timestamps on Venue, Artist and Show
+
+Revision ID: 5a9e3b7c1d82
+Revises: c41d7e9a2f05
+Create Date: 2026-10-18 13:20:54.671390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e3b7c1d82'
+down_revision = 'c41d7e9a2f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,32 @@
+"""Venue latitude/longitude with an earthdistance GiST index
+
+Revision ID: 7e1a5c9d3b26
+Revises: 4b8d1e6a3c95
+Create Date: 2026-10-18 17:41:09.538214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1a5c9d3b26'
+down_revision = '4b8d1e6a3c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # cube/earthdistance ship with Postgres contrib, unlike PostGIS.
+    op.execute('CREATE EXTENSION IF NOT EXISTS cube')
+    op.execute('CREATE EXTENSION IF NOT EXISTS earthdistance')
+    op.add_column('Venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_venue_location', 'Venue', [sa.text('ll_to_earth(latitude, longitude)')], unique=False,
+                    postgresql_using='gist')
+
+
+def downgrade():
+    op.drop_index('ix_venue_location', table_name='Venue')
+    op.drop_column('Venue', 'longitude')
+    op.drop_column('Venue', 'latitude')
@@ -0,0 +1,28 @@
+"""indexes on Show for venue, artist and start_time lookups
+
+Revision ID: 8b5e0f2d4c19
+Revises: 3f2c8d1a7b64
+Create Date: 2026-10-18 11:03:27.519846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5e0f2d4c19'
+down_revision = '3f2c8d1a7b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_show_start_time', 'Show', ['start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_start_time', table_name='Show')
+    op.drop_index('ix_show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,40 @@
+"""venue_areas materialized view
+
+Revision ID: 9c3e5b7d2f18
+Revises: 2d6f8a1c9e47
+Create Date: 2026-10-18 15:12:08.557043
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5b7d2f18'
+down_revision = '2d6f8a1c9e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per city/state with its venues pre-serialized in the shape the
+    # /venues template renders.
+    op.execute("""
+        CREATE MATERIALIZED VIEW venue_areas AS
+        SELECT city,
+               state,
+               jsonb_agg(jsonb_build_object(
+                   'id', id,
+                   'name', name,
+                   'num_upcoming_shows', upcoming_shows_count
+               ) ORDER BY id) AS venues,
+               timezone('utc', now()) AS refreshed_at
+        FROM "Venue"
+        GROUP BY city, state
+    """)
+    # Required by REFRESH ... CONCURRENTLY, and serves the ORDER BY on reads.
+    op.create_index('ix_venue_areas_city_state', 'venue_areas', ['city', 'state'], unique=True)
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
@@ -0,0 +1,46 @@
+"""venue_areas without the per-row refreshed_at
+
+Revision ID: a7d4e2c9f031
+Revises: f3a8c6d1b205
+Create Date: 2026-10-18 21:03:52.140627
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d4e2c9f031'
+down_revision = 'f3a8c6d1b205'
+branch_labels = None
+depends_on = None
+
+AREAS = """
+    SELECT city,
+           state,
+           jsonb_agg(jsonb_build_object(
+               'id', id,
+               'name', name,
+               'num_upcoming_shows', upcoming_shows_count
+           ) ORDER BY id) AS venues{refreshed_at}
+    FROM "Venue"
+    GROUP BY city, state
+"""
+
+
+def _create(refreshed_at=''):
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
+    op.execute('CREATE MATERIALIZED VIEW venue_areas AS' + AREAS.format(refreshed_at=refreshed_at))
+    op.create_index('ix_venue_areas_city_state', 'venue_areas', ['city', 'state'], unique=True)
+
+
+def upgrade():
+    # A refresh time on every row made each REFRESH ... CONCURRENTLY see every
+    # row as changed and rewrite the whole view. Without it only the areas
+    # whose venues changed are rewritten; the time of the last refresh is the
+    # 'venues' row of CacheTag, bumped by areas.refresh().
+    _create()
+
+
+def downgrade():
+    _create(",\n           timezone('utc', now()) AS refreshed_at")
@@ -0,0 +1,48 @@
+"""Job table for the Postgres-backed work queue
+
+Revision ID: b6f2d8e4a173
+Revises: 7e1a5c9d3b26
+Create Date: 2026-10-18 18:22:37.904611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f2d8e4a173'
+down_revision = '7e1a5c9d3b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Job',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('idempotency_key', sa.String(length=200), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='queued', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(length=200), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name='ck_job_status'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_job_due', 'Job', ['run_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'queued'"))
+    op.create_index('ix_job_running', 'Job', ['locked_at'], unique=False,
+                    postgresql_where=sa.text("status = 'running'"))
+
+
+def downgrade():
+    op.drop_index('ix_job_running', table_name='Job')
+    op.drop_index('ix_job_due', table_name='Job')
+    op.drop_table('Job')
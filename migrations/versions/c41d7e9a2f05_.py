@@ -0,0 +1,26 @@
+"""seek index on Show (start_time, id) for keyset pagination
+
+Revision ID: c41d7e9a2f05
+Revises: 8b5e0f2d4c19
+Create Date: 2026-10-18 11:48:09.204711
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7e9a2f05'
+down_revision = '8b5e0f2d4c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_show_start_time', table_name='Show')
+    op.create_index('ix_show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_start_time_id', table_name='Show')
+    op.create_index('ix_show_start_time', 'Show', ['start_time'], unique=False)
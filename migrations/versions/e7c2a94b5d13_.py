@@ -0,0 +1,67 @@
+"""Show end_time and exclusion constraints against double bookings
+
+Revision ID: e7c2a94b5d13
+Revises: 5a9e3b7c1d82
+Create Date: 2026-10-18 14:05:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c2a94b5d13'
+down_revision = '5a9e3b7c1d82'
+branch_labels = None
+depends_on = None
+
+
+# Shows already booked at the same moment at the same venue or for the same
+# artist. No backfilled end_time can separate them, so the upgrade stops
+# and lists them instead of guessing which booking to drop.
+DOUBLE_BOOKINGS = sa.text("""
+    SELECT 'venue' AS clash, a.id AS show_id, b.id AS other_id, a.start_time
+    FROM "Show" a JOIN "Show" b ON b.venue_id = a.venue_id AND b.start_time = a.start_time AND b.id > a.id
+    UNION ALL
+    SELECT 'artist', a.id, b.id, a.start_time
+    FROM "Show" a JOIN "Show" b ON b.artist_id = a.artist_id AND b.start_time = a.start_time AND b.id > a.id
+    ORDER BY start_time, show_id, other_id
+""")
+
+
+def upgrade():
+    clashes = op.get_bind().execute(DOUBLE_BOOKINGS).fetchall()
+    if clashes:
+        listed = '\n'.join('  shows %d and %d: same %s at %s' % (r.show_id, r.other_id, r.clash, r.start_time)
+                           for r in clashes[:50])
+        raise RuntimeError(
+            '%d pairs of shows are double-booked; delete or move one show of each pair and run the '
+            'upgrade again:\n%s%s' % (len(clashes), listed, '\n  ...' if len(clashes) > 50 else ''))
+
+    # btree_gist lets the plain integer ids share a GiST index with the time range.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # Existing shows run for the default two hours, cut short where the next
+    # show at the same venue or by the same artist starts, so the backfill
+    # never creates an overlap of its own. Both lookups seek the
+    # (<entity>_id, start_time) indexes; LEAST skips the NULL of a last show.
+    op.execute("""
+        UPDATE "Show" s SET end_time = LEAST(
+            s.start_time + interval '2 hours',
+            (SELECT min(n.start_time) FROM "Show" n WHERE n.venue_id = s.venue_id AND n.start_time > s.start_time),
+            (SELECT min(n.start_time) FROM "Show" n WHERE n.artist_id = s.artist_id AND n.start_time > s.start_time)
+        )
+    """)
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_show_end_after_start', 'Show', 'end_time > start_time')
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT ex_show_venue_overlap '
+               'EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)')
+    op.execute('ALTER TABLE "Show" ADD CONSTRAINT ex_show_artist_overlap '
+               'EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    op.drop_constraint('ex_show_artist_overlap', 'Show')
+    op.drop_constraint('ex_show_venue_overlap', 'Show')
+    op.drop_constraint('ck_show_end_after_start', 'Show', type_='check')
+    op.drop_column('Show', 'end_time')
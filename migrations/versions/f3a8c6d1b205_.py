@@ -0,0 +1,29 @@
+"""CacheTag versions for conditional requests and the page cache
+
+Revision ID: f3a8c6d1b205
+Revises: b6f2d8e4a173
+Create Date: 2026-10-18 20:41:09.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c6d1b205'
+down_revision = 'b6f2d8e4a173'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('CacheTag',
+        sa.Column('tag', sa.String(length=200), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='1', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('tag')
+    )
+
+
+def downgrade():
+    op.drop_table('CacheTag')
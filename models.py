@@ -1,9 +1,29 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from config import app
+from sqlalchemy.dialects.postgresql import ARRAY, ExcludeConstraint, JSONB
+from sqlalchemy.schema import FetchedValue
+from sqlalchemy.sql import table, column
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+db = SQLAlchemy()
+migrate = Migrate()
+
+_bound_session = ContextVar('bound_session', default=None)
+
+def read_session():
+    # Session the read queries run on: Flask-SQLAlchemy's, unless the async
+    # server (asgi.py) has bound one that talks to Postgres through asyncpg.
+    return _bound_session.get() or db.session
+
+@contextmanager
+def bound_session(session):
+    token = _bound_session.set(session)
+    try:
+        yield session
+    finally:
+        _bound_session.reset(token)
 
 
 #----------------------------------------------------------------------------#
@@ -11,35 +31,60 @@ migrate = Migrate(app, db)
 #----------------------------------------------------------------------------#
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venue_next_show_time', 'next_show_time'),
+        db.Index('ix_venue_genre_ids', 'genre_ids', postgresql_using='gin'),
+        # Radius searches (queries.venues_nearby) go through earthdistance.
+        db.Index('ix_venue_location', db.func.ll_to_earth(db.column('latitude'), db.column('longitude')),
+                 postgresql_using='gist'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
+    # Filled in by the offline geocoder (geocoder.py); NULL until then.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(ARRAY(db.String), nullable=False)
+    # Genre ids for the names above, kept in step by a database trigger.
+    genre_ids = db.Column(ARRAY(db.Integer), nullable=False, server_default='{}', server_onupdate=FetchedValue())
     website = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
-    shows = db.relationship("Show", backref="venue", lazy='joined', cascade="all, delete")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized from Show and maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime)
+    shows = db.relationship("Show", backref="venue", lazy='select', cascade="all, delete")
 
     def __repr__(self):
       return f'Venue {self.name}'
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artist_next_show_time', 'next_show_time'),
+        db.Index('ix_artist_genre_ids', 'genre_ids', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(ARRAY(db.String), nullable=False)
+    # Genre ids for the names above, kept in step by a database trigger.
+    genre_ids = db.Column(ARRAY(db.Integer), nullable=False, server_default='{}', server_onupdate=FetchedValue())
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
@@ -47,12 +92,96 @@ class Artist(db.Model):
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
-    shows = db.relationship("Show", backref="artist", lazy='joined', cascade="all, delete")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized from Show and maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime)
+    shows = db.relationship("Show", backref="artist", lazy='select', cascade="all, delete")
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+    def __repr__(self):
+      return f'Genre {self.name}'
+
+# Shows booked without an explicit end are assumed to run this long.
+SHOW_DEFAULT_DURATION = timedelta(hours=2)
+
+def default_end_time(context):
+    return context.get_current_parameters()['start_time'] + SHOW_DEFAULT_DURATION
 
 # DONE Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        db.CheckConstraint('end_time > start_time', name='ck_show_end_after_start'),
+        # A venue or an artist can only be booked once at any moment.
+        ExcludeConstraint(('venue_id', '='), (db.func.tsrange(db.column('start_time'), db.column('end_time')), '&&'),
+                          name='ex_show_venue_overlap', using='gist'),
+        ExcludeConstraint(('artist_id', '='), (db.func.tsrange(db.column('start_time'), db.column('end_time')), '&&'),
+                          name='ex_show_artist_overlap', using='gist'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.ForeignKey('Venue.id'), nullable=False)
     artist_id = db.Column(db.ForeignKey('Artist.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
\ No newline at end of file
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Background work run by `flask worker` (jobs.py). Times are UTC from the
+# database clock, so workers on different hosts agree on what is due.
+class Job(db.Model):
+    __tablename__ = 'Job'
+    __table_args__ = (
+        db.CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name='ck_job_status'),
+        # Workers only ever look up due jobs and stalled ones.
+        db.Index('ix_job_due', 'run_at', 'id', postgresql_where=db.text("status = 'queued'")),
+        db.Index('ix_job_running', 'locked_at', postgresql_where=db.text("status = 'running'")),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(JSONB, nullable=False, server_default='{}')
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, server_default='queued')
+    attempts = db.Column(db.Integer, nullable=False, server_default='0')
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, server_default=db.text("timezone('utc', now())"))
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(200))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text("timezone('utc', now())"))
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+      return f'Job {self.id} {self.kind} {self.status}'
+
+# One row per page-cache tag ('venues', 'venue:3', ...), bumped by
+# cache.invalidate() after every write. Conditional requests and page-cache
+# keys are built from these versions, so every process sees a write at once.
+class CacheTag(db.Model):
+    __tablename__ = 'CacheTag'
+
+    tag = db.Column(db.String(200), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text("timezone('utc', now())"))
+
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+# Materialized view refreshed by areas.py. Declared with the lightweight
+# table() construct so create_all and autogenerate leave it alone.
+venue_areas_view = table(
+    'venue_areas',
+    column('city'),
+    column('state'),
+    column('venues', JSONB)
+)
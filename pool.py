@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+from flask import current_app, has_request_context
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+#----------------------------------------------------------------------------#
+# Instrumented connection pool.
+#----------------------------------------------------------------------------#
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a free
+    # connection and how often it gave up, so pool_size/max_overflow can be
+    # sized from real numbers.
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                _stats['timeouts'] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with _lock:
+                _stats['waits'] += 1
+                _stats['wait_seconds'] += waited
+                _stats['max_wait_seconds'] = max(_stats['max_wait_seconds'], waited)
+
+
+@event.listens_for(TimedQueuePool, 'checkout')
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    with _lock:
+        _stats['checkouts'] += 1
+        _stats['checked_out'] += 1
+    _apply_statement_timeout(dbapi_connection, connection_record)
+
+@event.listens_for(TimedQueuePool, 'checkin')
+def on_checkin(dbapi_connection, connection_record):
+    with _lock:
+        _stats['checked_out'] -= 1
+
+@event.listens_for(TimedQueuePool, 'connect')
+def on_connect(dbapi_connection, connection_record):
+    with _lock:
+        _stats['connects'] += 1
+
+
+def _apply_statement_timeout(dbapi_connection, connection_record):
+    # DB_STATEMENT_TIMEOUT only guards request handling. Migrations, the CLI
+    # commands and the job worker check connections out with no request
+    # context and get the server default back if a request had set it. The
+    # SET is only sent when a connection changes sides, so a web process
+    # pays for it once per connection, and it is committed straight away
+    # because a rolled-back transaction would undo it.
+    timeout = current_app.config['DB_STATEMENT_TIMEOUT'] if has_request_context() else None
+    if connection_record.info.get('statement_timeout') == timeout:
+        return
+    cursor = dbapi_connection.cursor()
+    if timeout is None:
+        cursor.execute('RESET statement_timeout')
+    else:
+        cursor.execute('SET statement_timeout = %d' % timeout)
+    cursor.close()
+    dbapi_connection.commit()
+    connection_record.info['statement_timeout'] = timeout
+
+
+def collect():
+    with _lock:
+        stats = dict(_stats)
+    return [
+        ('fyyur_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool.', stats.get('checkouts', 0)),
+        ('fyyur_db_pool_checked_out', 'gauge', 'Connections currently checked out.', stats.get('checked_out', 0)),
+        ('fyyur_db_pool_connects_total', 'counter', 'New DBAPI connections opened.', stats.get('connects', 0)),
+        ('fyyur_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a pooled connection.', stats.get('wait_seconds', 0.0)),
+        ('fyyur_db_pool_max_wait_seconds', 'gauge', 'Longest wait for a pooled connection.', stats.get('max_wait_seconds', 0.0)),
+        ('fyyur_db_pool_timeouts_total', 'counter', 'Checkouts that hit pool_timeout.', stats.get('timeouts', 0))
+    ]
@@ -0,0 +1,477 @@
+import base64
+from datetime import datetime
+from itertools import groupby
+from sqlalchemy import any_, distinct, func, literal_column, or_, select, true, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from models import read_session, Venue, Artist, Show, Genre, CacheTag, venue_areas_view
+
+
+#----------------------------------------------------------------------------#
+# Venue queries.
+#----------------------------------------------------------------------------#
+
+def venue_areas(genre_id=None):
+    # One indexed read of the venue_areas materialized view, which already
+    # holds each city/state with its venues and upcoming show counts.
+    if genre_id:
+        return _genre_venue_areas(genre_id)
+    rows = read_session().query(
+            venue_areas_view.c.city,
+            venue_areas_view.c.state,
+            venue_areas_view.c.venues
+        )\
+        .order_by(venue_areas_view.c.city, venue_areas_view.c.state)\
+        .all()
+    return [{'city': r.city, 'state': r.state, 'venues': r.venues} for r in rows]
+
+def _genre_venue_areas(genre_id):
+    # The view is not split by genre, so a genre's venues are read live
+    # through the GIN index on genre_ids and grouped as they stream.
+    rows = read_session().query(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_shows_count)\
+        .filter(Venue.genre_ids.contains([genre_id]))\
+        .order_by(Venue.city, Venue.state, Venue.id)\
+        .yield_per(1000)
+    return [{
+        'city': city,
+        'state': state,
+        'venues': [{
+            'id': v.id,
+            'name': v.name,
+            'num_upcoming_shows': v.upcoming_shows_count
+        } for v in venues]
+    } for (city, state), venues in groupby(rows, key=lambda r: (r.city, r.state))]
+
+
+def venues_nearby(latitude, longitude, radius_km, limit, shows_per_venue, now=None):
+    # Venues within radius_km of a point, nearest first, each with its next
+    # few shows, in one statement. earth_box @> narrows through the GiST index
+    # on ll_to_earth(latitude, longitude), earth_distance trims the box to the
+    # circle, and cube's <-> (chord distance, same order as distance along
+    # the surface) lets the index return rows already ordered. Each venue's
+    # shows come from a LATERAL join on the (venue_id, start_time) index.
+    now = now or datetime.now()
+    radius = radius_km * 1000
+    origin = func.ll_to_earth(latitude, longitude)
+    location = func.ll_to_earth(Venue.latitude, Venue.longitude)
+    distance = func.earth_distance(origin, location)
+    near = select(
+            Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.image_link,
+            Venue.latitude, Venue.longitude, Venue.upcoming_shows_count, distance.label('distance')
+        )\
+        .where(func.earth_box(origin, radius).op('@>')(location), distance <= radius)\
+        .order_by(location.op('<->')(origin))\
+        .limit(limit)\
+        .subquery('near')
+    upcoming = select(
+            Show.id.label('show_id'),
+            Show.start_time,
+            Artist.id.label('artist_id'),
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link')
+        )\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .where(Show.venue_id == near.c.id, Show.start_time > now)\
+        .order_by(Show.start_time, Show.id)\
+        .limit(shows_per_venue)\
+        .lateral('upcoming')
+    rows = read_session().query(near, upcoming)\
+        .select_from(near)\
+        .outerjoin(upcoming, true())\
+        .order_by(near.c.distance, near.c.id, upcoming.c.start_time, upcoming.c.show_id)\
+        .all()
+    venues = []
+    for _, group in groupby(rows, key=lambda r: r.id):
+        group = list(group)
+        v = group[0]
+        venues.append({
+            'id': v.id,
+            'name': v.name,
+            'city': v.city,
+            'state': v.state,
+            'address': v.address,
+            'image_link': v.image_link,
+            'latitude': v.latitude,
+            'longitude': v.longitude,
+            'distance_km': round(v.distance / 1000, 2),
+            'num_upcoming_shows': v.upcoming_shows_count,
+            # The outer join leaves one all-NULL show on venues with none.
+            'upcoming_shows': [{
+                'artist_id': s.artist_id,
+                'artist_name': s.artist_name,
+                'artist_image_link': s.artist_image_link,
+                'start_time': s.start_time
+            } for s in group if s.show_id is not None]
+        })
+    return venues
+
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+def genre_facets(query, model):
+    # Matching rows per genre for everything query matches, as one GROUP BY:
+    # each row joins the Genre rows listed in its genre_ids.
+    matches = query.with_entities(model.genre_ids.label('genre_ids')).order_by(None).subquery()
+    rows = read_session().query(Genre.id, Genre.name, func.count().label('matches'))\
+        .select_from(matches)\
+        .join(Genre, Genre.id == any_(matches.c.genre_ids))\
+        .group_by(Genre.id)\
+        .order_by(func.count().desc(), Genre.name)\
+        .all()
+    return [{'id': r.id, 'name': r.name, 'count': r.matches} for r in rows]
+
+
+#----------------------------------------------------------------------------#
+# Show listing.
+#----------------------------------------------------------------------------#
+
+SHOWS_PER_PAGE = 30
+
+def encode_cursor(start_time, show_id):
+    raw = '%s|%d' % (start_time.isoformat(), show_id)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    # Returns the (start_time, id) seek key, or None for a missing/garbled cursor.
+    try:
+        start_time, show_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+SHOW_COLUMNS = {
+    'id': Show.id,
+    'start_time': Show.start_time,
+    'end_time': Show.end_time,
+    'venue_id': Venue.id,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+    'artist_id': Artist.id,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link
+}
+SHOW_LISTING_FIELDS = ('venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time')
+
+def _show_query(fields, when=None, date_from=None, date_to=None, now=None, genre_id=None, city=None):
+    # Only the requested columns are selected; id and start_time are always
+    # included (under private names) because they form the seek key.
+    now = now or datetime.now()
+    query = read_session().query(
+            Show.id.label('_id'),
+            Show.start_time.label('_start_time'),
+            *[SHOW_COLUMNS[f].label(f) for f in fields]
+        )\
+        .select_from(Show)\
+        .join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id)
+
+    if when == 'upcoming':
+        query = query.filter(Show.start_time > now)
+    elif when == 'past':
+        query = query.filter(Show.start_time <= now)
+    if date_from:
+        query = query.filter(Show.start_time >= date_from)
+    if date_to:
+        query = query.filter(Show.start_time < date_to)
+    if genre_id:
+        # A show's genres are its artist's; served by the GIN index on genre_ids.
+        query = query.filter(Artist.genre_ids.contains([genre_id]))
+    if city:
+        query = query.filter(func.lower(Venue.city) == city.lower())
+    return query
+
+def _show_dict(row, fields):
+    return {f: getattr(row, f) for f in fields}
+
+def show_listing(after=None, before=None, when=None, date_from=None, date_to=None, limit=SHOWS_PER_PAGE,
+                 fields=SHOW_LISTING_FIELDS, now=None, genre_id=None, city=None):
+    # Keyset pagination on (start_time, id): each page seeks past the cursor
+    # through the (start_time, id) index instead of counting through OFFSET
+    # rows, and only the columns the caller renders are selected.
+    query = _show_query(fields, when, date_from, date_to, now, genre_id, city)
+
+    key = tuple_(Show.start_time, Show.id)
+    after, before = decode_cursor(after), decode_cursor(before)
+    if before and not after:
+        # Walk backwards from the cursor, then restore ascending order.
+        rows = query.filter(key < tuple_(*before))\
+            .order_by(Show.start_time.desc(), Show.id.desc())\
+            .limit(limit + 1)\
+            .all()
+        has_prev, has_next = len(rows) > limit, True
+        rows = rows[:limit][::-1]
+    else:
+        if after:
+            query = query.filter(key > tuple_(*after))
+        rows = query.order_by(Show.start_time, Show.id)\
+            .limit(limit + 1)\
+            .all()
+        has_prev, has_next = after is not None, len(rows) > limit
+        rows = rows[:limit]
+
+    return {
+        'shows': [_show_dict(r, fields) for r in rows],
+        'prev_cursor': encode_cursor(rows[0]._start_time, rows[0]._id) if rows and has_prev else None,
+        'next_cursor': encode_cursor(rows[-1]._start_time, rows[-1]._id) if rows and has_next else None
+    }
+
+def show_stream(after=None, when=None, date_from=None, date_to=None, fields=SHOW_LISTING_FIELDS, now=None,
+                genre_id=None, city=None):
+    # Same query as show_listing, but unbounded and read through a server-side
+    # cursor so arbitrarily large exports never sit in memory at once.
+    query = _show_query(fields, when, date_from, date_to, now, genre_id, city)
+    after = decode_cursor(after)
+    if after:
+        query = query.filter(tuple_(Show.start_time, Show.id) > tuple_(*after))
+    for row in query.order_by(Show.start_time, Show.id).yield_per(1000):
+        yield _show_dict(row, fields)
+
+def show_row(show_id, fields=SHOW_LISTING_FIELDS):
+    row = _show_query(fields).filter(Show.id == show_id).first()
+    return _show_dict(row, fields) if row else None
+
+CONFLICT_FIELDS = ('id',) + SHOW_LISTING_FIELDS + ('end_time',)
+
+def booking_conflicts(venue_id, artist_id, start_time, end_time, fields=CONFLICT_FIELDS):
+    # Shows that overlap [start_time, end_time) at the same venue or with the
+    # same artist. The && range test is answered by the GiST indexes behind the
+    # ex_show_*_overlap exclusion constraints, so no table scan is needed.
+    overlaps = func.tsrange(Show.start_time, Show.end_time)\
+        .op('&&')(func.tsrange(start_time, end_time))
+    rows = _show_query(fields)\
+        .filter(or_(Show.venue_id == venue_id, Show.artist_id == artist_id), overlaps)\
+        .order_by(Show.start_time, Show.id)\
+        .all()
+    return [_show_dict(r, fields) for r in rows]
+
+
+#----------------------------------------------------------------------------#
+# Calendar.
+#----------------------------------------------------------------------------#
+
+CALENDAR_BUCKETS = ('day', 'week')
+
+def show_calendar(date_from, date_to, bucket='day', venue_id=None, artist_id=None, city=None, genre_id=None,
+                  shows_per_bucket=0):
+    # Shows per day or week in [date_from, date_to), counted by one
+    # date_trunc GROUP BY: a year-long window comes back as at most a few
+    # hundred rows however many shows it holds. Venue and artist filters
+    # seek the (<entity>_id, start_time) indexes, the rest the start_time
+    # index; Venue and Artist are only joined when a filter needs them.
+    # Each bucket also lists its first shows_per_bucket shows: the window's
+    # shows are ranked within their bucket once, counted in full, and only
+    # the top-ranked ones are joined for names and aggregated with jsonb_agg.
+    # Buckets without shows are left out.
+    if bucket not in CALENDAR_BUCKETS:
+        raise ValueError('Unsupported bucket: %s' % bucket)
+    # A literal rather than a bind, so SELECT and PARTITION BY are the same expression.
+    start = func.date_trunc(literal_column("'%s'" % bucket), Show.start_time)
+    ranked = select(
+            Show.id, Show.start_time, Show.end_time, Show.venue_id, Show.artist_id,
+            start.label('bucket_start'),
+            func.row_number().over(partition_by=start, order_by=(Show.start_time, Show.id)).label('rank')
+        )\
+        .where(Show.start_time >= date_from, Show.start_time < date_to)
+    if venue_id:
+        ranked = ranked.where(Show.venue_id == venue_id)
+    if artist_id:
+        ranked = ranked.where(Show.artist_id == artist_id)
+    if city:
+        ranked = ranked.join(Venue, Show.venue_id == Venue.id).where(func.lower(Venue.city) == city.lower())
+    if genre_id:
+        ranked = ranked.join(Artist, Show.artist_id == Artist.id).where(Artist.genre_ids.contains([genre_id]))
+    ranked = ranked.cte('ranked')
+
+    counts = select(
+            ranked.c.bucket_start,
+            func.count().label('shows'),
+            func.count(distinct(ranked.c.venue_id)).label('venues'),
+            func.count(distinct(ranked.c.artist_id)).label('artists')
+        )\
+        .group_by(ranked.c.bucket_start)\
+        .subquery('counts')
+    listed = select(
+            ranked.c.bucket_start,
+            func.jsonb_agg(aggregate_order_by(func.jsonb_build_object(
+                'id', ranked.c.id,
+                'start_time', ranked.c.start_time,
+                'end_time', ranked.c.end_time,
+                'venue_id', ranked.c.venue_id,
+                'venue_name', Venue.name,
+                'artist_id', ranked.c.artist_id,
+                'artist_name', Artist.name
+            ), ranked.c.start_time, ranked.c.id)).label('first_shows')
+        )\
+        .join(Venue, ranked.c.venue_id == Venue.id)\
+        .join(Artist, ranked.c.artist_id == Artist.id)\
+        .where(ranked.c.rank <= shows_per_bucket)\
+        .group_by(ranked.c.bucket_start)\
+        .subquery('listed')
+    rows = read_session().query(counts, listed.c.first_shows)\
+        .select_from(counts)\
+        .outerjoin(listed, listed.c.bucket_start == counts.c.bucket_start)\
+        .order_by(counts.c.bucket_start)\
+        .all()
+    return [{
+        'start': r.bucket_start,
+        'shows': r.shows,
+        'venues': r.venues,
+        'artists': r.artists,
+        'first_shows': r.first_shows or []
+    } for r in rows]
+
+def show_feed(show_key, entity_id, date_from):
+    # Every show of one venue or artist from date_from on, for the .ics
+    # feeds; read through a server-side cursor so long calendars stream.
+    rows = read_session().query(
+            Show.id, Show.start_time, Show.end_time, Show.updated_at,
+            Venue.id.label('venue_id'), Venue.name.label('venue_name'),
+            Venue.address.label('venue_address'), Venue.city.label('venue_city'), Venue.state.label('venue_state'),
+            Artist.id.label('artist_id'), Artist.name.label('artist_name')
+        )\
+        .join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .filter(show_key == entity_id, Show.start_time >= date_from)\
+        .order_by(Show.start_time, Show.id)\
+        .yield_per(1000)
+    for row in rows:
+        yield row
+
+
+#----------------------------------------------------------------------------#
+# Venue and artist listings.
+#----------------------------------------------------------------------------#
+
+def model_columns(model):
+    return {c.name: getattr(model, c.name) for c in model.__table__.columns}
+
+def _entity_query(model, fields, after=None, genre_id=None, **equals):
+    # equals narrows on exact column values, e.g. city='San Francisco'.
+    columns = model_columns(model)
+    query = read_session().query(*[columns[f].label(f) for f in fields])
+    if after is not None:
+        query = query.filter(model.id > after)
+    if genre_id:
+        query = query.filter(model.genre_ids.contains([genre_id]))
+    for name, value in equals.items():
+        if value is not None:
+            query = query.filter(columns[name] == value)
+    return query.order_by(model.id)
+
+def entity_listing(model, fields, after=None, limit=None, genre_id=None):
+    # Keyset pagination on id; limit=None returns everything after the cursor.
+    rows = _entity_query(model, ('id',) + tuple(f for f in fields if f != 'id'), after, genre_id)
+    if limit is not None:
+        rows = rows.limit(limit + 1)
+    rows = rows.all()
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'data': [{f: getattr(r, f) for f in fields} for r in rows],
+        'next_cursor': rows[-1].id if rows and more else None
+    }
+
+def entity_stream(model, fields, after=None, genre_id=None, **equals):
+    for row in _entity_query(model, fields, after, genre_id, **equals).yield_per(1000):
+        yield dict(zip(fields, row))
+
+def entity_row(model, entity_id, fields):
+    columns = model_columns(model)
+    row = read_session().query(*[columns[f].label(f) for f in fields]).filter(model.id == entity_id).first()
+    return dict(zip(fields, row)) if row else None
+
+
+#----------------------------------------------------------------------------#
+# Profile pages.
+#----------------------------------------------------------------------------#
+
+def _profile_shows(show_key, entity_id, other, prefix, upcoming_limit, past_limit, past_before=None, now=None):
+    # Upcoming and past shows as two bounded, ordered queries plus one count
+    # query, instead of loading the entity's whole booking history. Past shows
+    # page backwards through past_before, a (start_time, id) cursor.
+    now = now or datetime.now()
+    other_key = Show.artist_id if other is Artist else Show.venue_id
+    upcoming_count, past_count = read_session().query(
+            func.count(Show.id).filter(Show.start_time > now),
+            func.count(Show.id).filter(Show.start_time <= now)
+        )\
+        .filter(show_key == entity_id)\
+        .one()
+
+    query = read_session().query(Show.id, Show.start_time, other.id, other.name, other.image_link)\
+        .join(other, other_key == other.id)\
+        .filter(show_key == entity_id)
+
+    upcoming = query.filter(Show.start_time > now)\
+        .order_by(Show.start_time, Show.id)\
+        .limit(upcoming_limit)\
+        .all()
+
+    past_query = query.filter(Show.start_time <= now)
+    cursor = decode_cursor(past_before)
+    if cursor:
+        past_query = past_query.filter(tuple_(Show.start_time, Show.id) < tuple_(*cursor))
+    past = past_query.order_by(Show.start_time.desc(), Show.id.desc())\
+        .limit(past_limit + 1)\
+        .all()
+
+    def transform(r):
+        return {
+            prefix + '_id': r[2],
+            prefix + '_name': r[3],
+            prefix + '_image_link': r[4],
+            'start_time': r.start_time
+        }
+
+    more_past = len(past) > past_limit
+    past = past[:past_limit]
+    return {
+        'upcoming_shows': [transform(r) for r in upcoming],
+        'upcoming_shows_count': upcoming_count,
+        'past_shows': [transform(r) for r in past],
+        'past_shows_count': past_count,
+        'past_shows_cursor': encode_cursor(past[-1].start_time, past[-1].id) if more_past else None
+    }
+
+def venue_profile(venue_id, upcoming_limit, past_limit, past_before=None):
+    venue = read_session().get(Venue, venue_id)
+    if venue is None:
+        return None
+    data = {name: getattr(venue, name) for name in model_columns(Venue)}
+    data.update(_profile_shows(Show.venue_id, venue_id, Artist, 'artist', upcoming_limit, past_limit, past_before))
+    return data
+
+def artist_profile(artist_id, upcoming_limit, past_limit, past_before=None):
+    artist = read_session().get(Artist, artist_id)
+    if artist is None:
+        return None
+    data = {name: getattr(artist, name) for name in model_columns(Artist)}
+    data.update(_profile_shows(Show.artist_id, artist_id, Venue, 'venue', upcoming_limit, past_limit, past_before))
+    return data
+
+
+#----------------------------------------------------------------------------#
+# Related entities.
+#----------------------------------------------------------------------------#
+
+def venue_artist_ids(venue_id):
+    rows = read_session().query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return [r.artist_id for r in rows]
+
+def artist_venue_ids(artist_id):
+    rows = read_session().query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return [r.venue_id for r in rows]
+
+
+#----------------------------------------------------------------------------#
+# Cache tag versions.
+#----------------------------------------------------------------------------#
+
+def tag_versions(tags):
+    # {tag: (version, updated_at)} for the tags that have been invalidated at
+    # least once; a primary key lookup however large the catalog grows.
+    rows = read_session().query(CacheTag.tag, CacheTag.version, CacheTag.updated_at)\
+        .filter(CacheTag.tag.in_(tags))\
+        .all()
+    return {r.tag: (r.version, r.updated_at) for r in rows}
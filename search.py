@@ -0,0 +1,56 @@
+from sqlalchemy import func
+from models import read_session, Venue, Artist
+from queries import genre_facets
+
+PER_PAGE = 20
+
+
+#----------------------------------------------------------------------------#
+# Search service.
+#----------------------------------------------------------------------------#
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search(model, search_term='', city=None, state=None, genre=None, page=1, per_page=PER_PAGE):
+    # Name matching goes through the pg_trgm GIN index on <model>.name, so the
+    # ILIKE no longer scans the whole table. Results are ranked by trigram
+    # similarity to the search term, best match first.
+    query = read_session().query(model.id, model.name, model.upcoming_shows_count)
+    if search_term:
+        query = query.filter(model.name.ilike('%' + _escape_like(search_term) + '%', escape='\\'))
+    if city:
+        query = query.filter(func.lower(model.city) == city.lower())
+    if state:
+        query = query.filter(func.lower(model.state) == state.lower())
+    # Facets ignore the genre filter itself, so every genre stays selectable.
+    facets = genre_facets(query, model)
+    if genre:
+        query = query.filter(model.genre_ids.contains([genre]))
+
+    count = query.order_by(None).count()
+
+    if search_term:
+        query = query.order_by(func.similarity(model.name, search_term).desc(), model.id)
+    else:
+        query = query.order_by(model.id)
+    page = max(page, 1)
+    matches = query.limit(per_page).offset((page - 1) * per_page).all()
+
+    return {
+        'count': count,
+        'page': page,
+        'pages': (count + per_page - 1) // per_page,
+        'facets': facets,
+        'data': [{
+            'id': m.id,
+            'name': m.name,
+            'num_upcoming_shows': m.upcoming_shows_count
+        } for m in matches]
+    }
+
+def search_venues(search_term='', **filters):
+    return search(Venue, search_term, **filters)
+
+def search_artists(search_term='', **filters):
+    return search(Artist, search_term, **filters)
@@ -0,0 +1,142 @@
+"""Shared fixtures.
+
+The suite runs against a scratch Postgres database given by TEST_DATABASE_URL
+(default postgresql://postgres@localhost:5432/fyyur_test). It is migrated to
+head and reseeded with bench/generate.py's deterministic catalog once per
+session; everything in it is overwritten. Without a reachable database every
+test is skipped.
+
+    createdb fyyur_test
+    python -m pytest -q
+"""
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur_test')
+# config.py reads DATABASE_URL at import time.
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'bench')]
+
+from flask import g, request  # noqa: E402
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import exc, text  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, Venue, Artist, Show  # noqa: E402
+import areas  # noqa: E402
+import counters  # noqa: E402
+import generate  # noqa: E402
+
+STATEMENTS = re.compile(r'desc="(\d+) statements"')
+
+# Catalog size: big enough that the planner prefers the indexes, small enough
+# to seed in a few seconds.
+VENUES = 1000
+ARTISTS = 2000
+SHOWS = 20000
+CITIES = 100
+
+# Calendar query window around the seeded origin (now), so calendar tests
+# always see populated buckets whenever they run.
+CALENDAR_WINDOW = {
+    'from': (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'),
+    'to': (datetime.now() + timedelta(days=60)).strftime('%Y-%m-%d')
+}
+
+# Most statements each endpoint may run per request, page cache off. A view
+# that starts loading relationships row by row blows through these. Streamed
+# responses are counted up to the point the body starts streaming.
+STATEMENT_BUDGETS = {
+    'index': 0,
+    'venues.venues': 2,
+    'venues.search_venues': 3,
+    'venues.nearby_venues': 1,
+    'venues.show_venue': 5,
+    'venues.venue_calendar': 2,
+    'venues.edit_venue': 1,
+    'artists.artists': 2,
+    'artists.search_artists': 3,
+    'artists.show_artist': 5,
+    'artists.artist_calendar': 2,
+    'artists.edit_artist': 1,
+    'shows.shows': 2,
+    'api.venues': 1,
+    'api.venues_near': 1,
+    'api.venue': 1,
+    'api.artists': 1,
+    'api.artist': 1,
+    'api.shows': 1,
+    'api.show': 1,
+    'api.calendar': 2
+}
+# Requests that went over budget since the last client fixture started.
+overruns = []
+
+def seed(rng_seed=1):
+    db.session.execute(text('TRUNCATE "Show", "Artist", "Venue", "Job", "CacheTag" RESTART IDENTITY CASCADE'))
+    db.session.commit()
+    rng = random.Random(rng_seed)
+    origin = datetime.now().replace(hour=20, minute=0, second=0, microsecond=0)
+    _, venue_ids = generate.load(Venue, generate.venues(rng, VENUES, CITIES, 1.1), 2000)
+    _, artist_ids = generate.load(Artist, generate.artists(rng, ARTISTS, CITIES, 1.1), 2000)
+    generate.load(Show, generate.shows(rng, SHOWS, venue_ids, artist_ids, 1.1, origin), 2000)
+    counters.recount(Venue)
+    counters.recount(Artist)
+    db.session.commit()
+    areas.refresh()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def check_budget(response):
+    budget = STATEMENT_BUDGETS.get(request.endpoint)
+    count = g.sql_stats['count'] if 'sql_stats' in g else 0
+    if budget is not None and count > budget:
+        overruns.append('%s %s: %d statements, budget %d' % (request.method, request.full_path, count, budget))
+    return response
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, CACHE_ENABLED=False)
+    app.after_request(check_budget)
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+        except exc.OperationalError:
+            pytest.skip('no test database at %s' % TEST_DATABASE_URL)
+        db.session.remove()
+        upgrade()
+        seed()
+        db.session.remove()
+    return app
+
+
+@pytest.fixture
+def ctx(app):
+    # Requests made inside an app context share its g, and with it the
+    # statement count, so tests that query directly take their own context
+    # and tests that count statements stay outside one.
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    # Every request the test makes is held to STATEMENT_BUDGETS; the test
+    # fails at teardown if any endpoint went over.
+    overruns.clear()
+    yield app.test_client()
+    assert not overruns, '\n'.join(overruns)
+
+
+def statements(response):
+    match = STATEMENTS.search(response.headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else None
@@ -0,0 +1,77 @@
+from fnmatch import fnmatch
+from cache import RedisCache, make_backend
+
+
+class FakeRedis:
+    # Just the commands RedisCache uses; expiry is recorded, not enforced.
+
+    def __init__(self, url=None):
+        self.url = url
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+        self.ttls[key] = ex
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member.encode())
+
+    def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.ttls.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        return [key for key in list(self.data) if fnmatch(key, match)]
+
+
+def backend(client, ttl=60):
+    config = {'CACHE_BACKEND': 'redis', 'CACHE_REDIS_URL': 'redis://cache/1', 'CACHE_TTL': ttl}
+    return make_backend(config, client_factory=lambda url: client)
+
+
+def test_make_backend_uses_the_injected_client():
+    made = make_backend({'CACHE_BACKEND': 'redis', 'CACHE_REDIS_URL': 'redis://cache/1', 'CACHE_TTL': 5,
+                         'CACHE_REDIS_CLIENT': FakeRedis})
+    assert isinstance(made, RedisCache)
+    assert made.client.url == 'redis://cache/1'
+
+
+def test_tag_sets_expire_with_their_pages():
+    client = FakeRedis()
+    cache = backend(client, ttl=30)
+    cache.set('/venues/1', '<html>', ['venue:1', 'venues'])
+    assert client.ttls == {'fyyur:page:/venues/1': 30, 'fyyur:tag:venue:1': 30, 'fyyur:tag:venues': 30}
+
+
+def test_invalidate_drops_tagged_pages_only():
+    cache = backend(FakeRedis())
+    cache.set('/venues/1', 'one', ['venue:1'])
+    cache.set('/venues/2', 'two', ['venue:2'])
+    cache.invalidate('venue:1')
+    assert cache.get('/venues/1') is None
+    assert cache.get('/venues/2') == 'two'
+
+
+def test_clear_leaves_other_prefixes_alone():
+    client = FakeRedis()
+    client.set('other:page:/', 'kept')
+    cache = backend(client)
+    cache.set('/venues', 'page', ['venues'])
+    cache.clear()
+    assert cache.get('/venues') is None
+    assert list(client.data) == ['other:page:/']
+
+
+def test_cache_stats_are_off_by_default(app, client):
+    assert not app.config['CACHE_ADMIN_ENABLED']
+    assert client.get('/_cache').status_code == 404
@@ -0,0 +1,28 @@
+from datetime import datetime
+from models import db, Show
+from conftest import CALENDAR_WINDOW
+
+
+def test_buckets_list_their_first_shows(app, client):
+    response = client.get('/api/v1/calendar', query_string=dict(
+        CALENDAR_WINDOW, bucket='week', per_bucket=3))
+    assert response.status_code == 200
+    buckets = response.get_json()['data']
+    assert buckets
+    with app.app_context():
+        for bucket in buckets:
+            listed = bucket['first_shows']
+            assert len(listed) == min(bucket['shows'], 3)
+            starts = [s['start_time'] for s in listed]
+            assert starts == sorted(starts)
+            first = db.session.get(Show, listed[0]['id'])
+            assert first.start_time == datetime.fromisoformat(starts[0])
+            assert listed[0]['venue_name'] == first.venue.name
+
+
+def test_per_bucket_is_capped(app, client):
+    response = client.get('/api/v1/calendar', query_string=dict(
+        CALENDAR_WINDOW, bucket='week', per_bucket=10000))
+    cap = app.config['CALENDAR_MAX_SHOWS_PER_BUCKET']
+    assert response.get_json()['data']
+    assert max(len(b['first_shows']) for b in response.get_json()['data']) == cap
@@ -0,0 +1,51 @@
+from sqlalchemy import text
+from models import db, Artist
+from cache import invalidate
+
+
+def test_etag_answers_304_until_the_tag_is_invalidated(app, client):
+    first = client.get('/venues/1')
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.headers['ETag'] == first.headers['ETag']
+
+    with app.app_context():
+        invalidate('venue:1')
+    after = client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != first.headers['ETag']
+    assert after.headers['Last-Modified']
+
+
+def test_stale_etag_wins_over_if_modified_since(app, client):
+    with app.app_context():
+        invalidate('artists')
+    first = client.get('/artists')
+    with app.app_context():
+        invalidate('artists')
+    response = client.get('/artists', headers={
+        'If-None-Match': first.headers['ETag'],
+        'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'
+    })
+    assert response.status_code == 200
+
+
+def test_page_cache_follows_versions_bumped_elsewhere(app, client, monkeypatch):
+    # Another process (a worker, another web server) commits a write and
+    # bumps the tag; this process's memory cache still holds the old page.
+    monkeypatch.setitem(app.config, 'CACHE_ENABLED', True)
+    with app.app_context():
+        name = db.session.get(Artist, 1).name
+    assert name in client.get('/artists/1').get_data(as_text=True)
+    try:
+        with app.app_context():
+            db.session.execute(text('UPDATE "Artist" SET name = \'Renamed Elsewhere\' WHERE id = 1'))
+            db.session.execute(text('UPDATE "CacheTag" SET version = version + 1 WHERE tag = \'artist:1\''))
+            db.session.execute(text('INSERT INTO "CacheTag" (tag) VALUES (\'artist:1\') ON CONFLICT DO NOTHING'))
+            db.session.commit()
+        assert 'Renamed Elsewhere' in client.get('/artists/1').get_data(as_text=True)
+    finally:
+        with app.app_context():
+            db.session.execute(text('UPDATE "Artist" SET name = :name WHERE id = 1'), {'name': name})
+            db.session.commit()
+            invalidate('artist:1')
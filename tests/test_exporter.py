@@ -0,0 +1,13 @@
+import csv
+import io
+from models import db, Venue
+import exporter
+
+
+def test_csv_export_writes_integer_arrays(ctx):
+    body = b''.join(exporter.export('venues', 'csv', city='City 0')).decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+    venue = db.session.get(Venue, int(rows[0]['id']))
+    assert rows[0]['genres'] == ';'.join(venue.genres)
+    assert rows[0]['genre_ids'] == ';'.join(str(i) for i in venue.genre_ids)
+    assert len(rows) == Venue.query.filter_by(city='City 0').count()
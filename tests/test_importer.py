@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+from models import db, Show
+import importer
+
+
+def test_double_booking_is_reported_not_skipped(ctx):
+    show = db.session.query(Show).filter(Show.start_time > datetime.now()).order_by(Show.id).first()
+    before = db.session.query(Show).count()
+    far = datetime.now() + timedelta(days=3650)
+    report = importer.import_rows('shows', [
+        (2, {'venue_id': show.venue_id, 'artist_id': show.artist_id,
+             'start_time': (show.start_time + timedelta(minutes=30)).strftime('%Y-%m-%d %H:%M:%S')}),
+        # An id that is already taken is still skipped.
+        (3, {'id': show.id, 'venue_id': show.venue_id, 'artist_id': show.artist_id,
+             'start_time': far.strftime('%Y-%m-%d %H:%M:%S')})
+    ])
+    assert report['inserted'] == 0
+    assert report['skipped'] == 1
+    [error] = report['errors']
+    assert error['line'] == 2
+    assert show.id in [c['id'] for c in error['conflicts']]
+    assert db.session.query(Show).count() == before
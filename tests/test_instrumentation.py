@@ -0,0 +1,18 @@
+import logging
+import re
+
+
+def test_metrics_are_off_by_default(app, client):
+    assert not app.config['METRICS_ENABLED']
+    assert client.get('/_metrics').status_code == 404
+
+
+def test_slowest_statement_is_reported(app, client, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'SLOW_STATEMENT_MS', 0)
+    # Alembic's fileConfig in the app fixture's upgrade() disables existing loggers.
+    monkeypatch.setattr(logging.getLogger('instrumentation'), 'disabled', False)
+    with caplog.at_level(logging.WARNING, logger='instrumentation'):
+        response = client.get('/venues')
+    timing = re.search(r'slowest;dur=([\d.]+)', response.headers['Server-Timing'])
+    assert timing and float(timing.group(1)) > 0
+    assert any(r.getMessage().startswith('Slow statement on /venues') for r in caplog.records)
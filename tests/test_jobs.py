@@ -0,0 +1,27 @@
+from sqlalchemy import text
+from models import db
+import areas
+import jobs
+
+
+def test_worker_refresh_reaches_the_web_page_cache(app, client, monkeypatch):
+    # The refresh runs in a worker process, whose invalidate() cannot touch
+    # the web process's memory cache; the bumped 'venues' version must still
+    # keep the old /venues page from being served.
+    monkeypatch.setitem(app.config, 'CACHE_ENABLED', True)
+    assert 'Venue 0<' in client.get('/venues').get_data(as_text=True)
+    try:
+        with app.app_context():
+            db.session.execute(text('UPDATE "Venue" SET name = \'Venue Zero\' WHERE name = \'Venue 0\''))
+            jobs.enqueue('areas.refresh', key='test-refresh')
+            db.session.commit()
+            job = jobs.claim('test-worker', ['areas.refresh'])
+            jobs.run(job)
+        page = client.get('/venues').get_data(as_text=True)
+        assert 'Venue Zero<' in page and 'Venue 0<' not in page
+    finally:
+        with app.app_context():
+            db.session.execute(text('UPDATE "Venue" SET name = \'Venue 0\' WHERE name = \'Venue Zero\''))
+            db.session.execute(text('DELETE FROM "Job" WHERE idempotency_key = \'test-refresh\''))
+            db.session.commit()
+            areas.refresh()
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+from models import db
+
+
+def statement_timeout():
+    value = db.session.execute(text('SHOW statement_timeout')).scalar()
+    db.session.remove()
+    return value
+
+
+def test_statement_timeout_only_applies_to_requests(app):
+    with app.test_request_context('/'):
+        assert statement_timeout() == '%ds' % (app.config['DB_STATEMENT_TIMEOUT'] // 1000)
+    # The same pooled connection, now used by a CLI command or the worker.
+    with app.app_context():
+        assert statement_timeout() == '0'
+    with app.test_request_context('/'):
+        assert statement_timeout() != '0'
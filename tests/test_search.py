@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import func
+from models import db, Venue, Artist, Show
+from conftest import statements
+import search
+
+
+def upcoming_counts(show_key, ids):
+    rows = db.session.query(show_key, func.count(Show.id))\
+        .filter(show_key.in_(ids), Show.start_time > datetime.now())\
+        .group_by(show_key)\
+        .all()
+    return dict(rows)
+
+
+def test_venue_counts_are_the_venues_own_shows(ctx):
+    # Regression: venue search used to count Show.artist_id == venue id.
+    result = search.search_venues('Venue', per_page=50)
+    ids = [v['id'] for v in result['data']]
+    expected = upcoming_counts(Show.venue_id, ids)
+    assert any(expected.values())
+    for venue in result['data']:
+        assert venue['num_upcoming_shows'] == expected.get(venue['id'], 0), venue
+
+
+def test_artist_counts_are_the_artists_own_shows(ctx):
+    result = search.search_artists('Artist', per_page=50)
+    ids = [a['id'] for a in result['data']]
+    expected = upcoming_counts(Show.artist_id, ids)
+    assert any(expected.values())
+    for artist in result['data']:
+        assert artist['num_upcoming_shows'] == expected.get(artist['id'], 0), artist
+
+
+def test_search_statements_do_not_grow_with_matches(app, client):
+    # One match or a full page of matches costs the same statements.
+    one = client.post('/venues/search', data={'search_term': 'Venue 999'})
+    many = client.post('/venues/search', data={'search_term': 'Venue'})
+    none = client.get('/artists/search', query_string={'search_term': 'no such artist'})
+    full = client.get('/artists/search', query_string={'search_term': 'Artist'})
+    assert one.status_code == many.status_code == none.status_code == full.status_code == 200
+    assert statements(one) == statements(many)
+    assert statements(none) == statements(full)
+    with app.app_context():
+        assert Venue.query.filter(Venue.name.like('Venue%')).count() > 20
+        assert Artist.query.filter(Artist.name.like('Artist%')).count() > 20
+
+
+def test_city_and_state_match_case_insensitively(ctx):
+    venue = db.session.query(Venue).order_by(Venue.id).first()
+    exact = search.search_venues('', city=venue.city, state=venue.state, per_page=50)
+    folded = search.search_venues('', city=venue.city.lower(), state=venue.state.lower(), per_page=50)
+    assert exact['count'] > 0
+    assert folded['count'] == exact['count']
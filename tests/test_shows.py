@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from models import db, Show
+
+
+def test_end_before_start_is_rejected_by_the_form(app, client):
+    with app.app_context():
+        before = db.session.query(Show).count()
+    response = client.post('/shows/create', data={
+        'artist_id': '1',
+        'venue_id': '1',
+        'start_time': '2030-01-01 20:00:00',
+        'end_time': '2030-01-01 19:00:00'
+    })
+    assert response.status_code == 400
+    assert 'End time must be after the start time.' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.query(Show).count() == before
+
+
+def test_overlapping_booking_lists_the_clash(app, client):
+    with app.app_context():
+        show = db.session.query(Show).filter(Show.start_time > datetime.now()).order_by(Show.id).first()
+        venue_id, start = show.venue_id, show.start_time
+    response = client.post('/shows/create', data={
+        'artist_id': '1',
+        'venue_id': str(venue_id),
+        'start_time': (start + timedelta(minutes=30)).strftime('%Y-%m-%d %H:%M:%S')
+    })
+    assert response.status_code == 409
+    assert 'This booking overlaps with:' in response.get_data(as_text=True)
@@ -0,0 +1,60 @@
+import pytest
+from models import db, Show
+from conftest import STATEMENT_BUDGETS, CALENDAR_WINDOW
+import generate
+
+LAT, LNG = generate.city_centre(0)
+CALENDAR = '/api/v1/calendar?from=%(from)s&to=%(to)s' % CALENDAR_WINDOW
+
+# Read routes with {venue}, {artist} and {show} filled in from the seeded
+# catalog: the busiest venue and artist, so pages carry full show lists.
+ROUTES = [
+    '/',
+    '/venues',
+    '/venues?genre=1',
+    '/venues/search?search_term=Venue',
+    '/venues/nearby?lat=%s&lng=%s&radius=10' % (LAT, LNG),
+    '/venues/{venue}',
+    '/venues/{venue}/calendar.ics',
+    '/venues/{venue}/edit',
+    '/artists',
+    '/artists/search?search_term=Artist',
+    '/artists/{artist}',
+    '/artists/{artist}/calendar.ics',
+    '/artists/{artist}/edit',
+    '/shows',
+    '/shows?when=past',
+    '/api/v1/venues',
+    '/api/v1/venues/nearby?lat=%s&lng=%s&radius=10' % (LAT, LNG),
+    '/api/v1/venues/{venue}',
+    '/api/v1/artists',
+    '/api/v1/artists/{artist}',
+    '/api/v1/shows',
+    '/api/v1/shows/{show}',
+    CALENDAR,
+    CALENDAR + '&bucket=week&venue={venue}'
+]
+
+
+@pytest.fixture(scope='module')
+def ids(app):
+    with app.app_context():
+        busiest = lambda key: db.session.query(key).group_by(key).order_by(db.func.count().desc()).limit(1).scalar()
+        return {
+            'venue': busiest(Show.venue_id),
+            'artist': busiest(Show.artist_id),
+            'show': db.session.query(Show.id).order_by(Show.id).limit(1).scalar()
+        }
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_read_routes_stay_within_budget(client, ids, route):
+    response = client.get(route.format(**ids))
+    response.get_data()
+    assert response.status_code == 200
+
+
+def test_every_budgeted_endpoint_is_exercised(app, ids):
+    adapter = app.url_map.bind('localhost')
+    hit = {adapter.match(route.format(**ids).split('?')[0])[0] for route in ROUTES}
+    assert hit == set(STATEMENT_BUDGETS)
@@ -0,0 +1,66 @@
+import hmac
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, request, abort, current_app, stream_with_context
+import ical
+
+
+#----------------------------------------------------------------------------#
+# Request helpers shared by the blueprints.
+#----------------------------------------------------------------------------#
+
+def parse_date(value):
+  # YYYY-MM-DD query string dates; anything unparseable is ignored
+  try:
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+  except ValueError:
+    return None
+
+def search_filters():
+  # optional city/state/genre narrowing shared by both search endpoints;
+  # genre is a Genre id
+  return {
+    'city': request.values.get('city') or None,
+    'state': request.values.get('state') or None,
+    'genre': request.values.get('genre', type=int) or None
+  }
+
+def nearby_point():
+  # lat/lng/radius (km) for the nearby endpoints, or None when no point was
+  # given; radius defaults to NEARBY_RADIUS_KM and is capped at
+  # NEARBY_MAX_RADIUS_KM
+  latitude = request.args.get('lat', type=float)
+  longitude = request.args.get('lng', type=float)
+  if latitude is None or longitude is None:
+    return None
+  radius = request.args.get('radius', current_app.config['NEARBY_RADIUS_KM'], type=float)
+  if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and radius > 0):
+    abort(400, 'lat must be in [-90, 90], lng in [-180, 180] and radius positive')
+  return {
+    'latitude': latitude,
+    'longitude': longitude,
+    'radius_km': min(radius, current_app.config['NEARBY_MAX_RADIUS_KM'])
+  }
+
+def feed_start():
+  # .ics feeds cover the last ICS_PAST_DAYS days and everything upcoming
+  return datetime.now() - timedelta(days=current_app.config['ICS_PAST_DAYS'])
+
+def calendar_response(name, shows, filename):
+  # streamed straight from the cursor; calendar apps poll these, so the
+  # views sit behind the same conditional-request checks as the pages
+  chunks = ical.calendar(name, shows, request.url_root, request.host)
+  return Response(stream_with_context(chunks), mimetype='text/calendar',
+    headers={'Content-Disposition': 'inline; filename=' + filename})
+
+def token_required(f):
+  # Bulk endpoints need 'Authorization: Bearer <BULK_API_TOKEN>'; with no token
+  # configured they are closed entirely.
+  @wraps(f)
+  def wrapper(*args, **kwargs):
+    token = current_app.config['BULK_API_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(supplied.encode(), ('Bearer ' + token).encode()):
+      abort(401)
+    return f(*args, **kwargs)
+  return wrapper
@@ -0,0 +1,202 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, abort, stream_with_context, current_app
+from models import Venue, Artist
+from queries import SHOW_COLUMNS, model_columns, entity_listing, entity_stream, entity_row, \
+  show_listing, show_stream, show_row, venues_nearby, show_calendar, CALENDAR_BUCKETS
+from views import parse_date, token_required, nearby_point
+from cache import conditional
+from importer import KINDS, import_stream
+import exporter
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def _default(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  raise TypeError(repr(value))
+
+def _fields(allowed):
+  # ?fields=id,name selects a sparse fieldset; unknown names are a 400
+  requested = request.args.get('fields')
+  if not requested:
+    return tuple(allowed)
+  fields = tuple(f.strip() for f in requested.split(',') if f.strip())
+  unknown = [f for f in fields if f not in allowed]
+  if unknown or not fields:
+    abort(400, 'Unknown fields: ' + ', '.join(unknown))
+  return fields
+
+def _limit():
+  return min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+
+def _wants_jsonl():
+  return request.args.get('format') == 'jsonl' \
+    or request.accept_mimetypes.best == 'application/x-ndjson'
+
+def _json(data, status=200):
+  return Response(json.dumps(data, default=_default), status=status, mimetype='application/json')
+
+def _jsonl(rows):
+  # One JSON document per line, produced as rows come off the cursor.
+  def generate():
+    for row in rows:
+      yield json.dumps(row, default=_default) + '\n'
+  return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.errorhandler(400)
+def bad_request(error):
+  return jsonify({'error': error.description}), 400
+
+@bp.errorhandler(401)
+def unauthorized(error):
+  return jsonify({'error': 'Authentication required'}), 401
+
+@bp.errorhandler(404)
+def not_found(error):
+  return jsonify({'error': 'Not found'}), 404
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+def _entity_list(model):
+  fields = _fields(model_columns(model))
+  after = request.args.get('after', type=int)
+  genre_id = request.args.get('genre', type=int)
+  if _wants_jsonl():
+    return _jsonl(entity_stream(model, fields, after=after, genre_id=genre_id))
+  return _json(entity_listing(model, fields, after=after, limit=_limit(), genre_id=genre_id))
+
+def _entity_detail(model, entity_id):
+  row = entity_row(model, entity_id, _fields(model_columns(model)))
+  if row is None:
+    abort(404)
+  return _json({'data': row})
+
+@bp.route('/venues')
+def venues():
+  return _entity_list(Venue)
+
+@bp.route('/venues/nearby')
+def venues_near():
+  # ?lat=&lng=[&radius=km][&limit=]; each venue carries distance_km and its
+  # next few upcoming shows
+  point = nearby_point()
+  if point is None:
+    abort(400, 'lat and lng are required')
+  return _json({'data': venues_nearby(limit=_limit(),
+    shows_per_venue=current_app.config['NEARBY_SHOWS_PER_VENUE'], **point)})
+
+@bp.route('/venues/<int:venue_id>')
+def venue(venue_id):
+  return _entity_detail(Venue, venue_id)
+
+@bp.route('/artists')
+def artists():
+  return _entity_list(Artist)
+
+@bp.route('/artists/<int:artist_id>')
+def artist(artist_id):
+  return _entity_detail(Artist, artist_id)
+
+@bp.route('/shows')
+def shows():
+  fields = _fields(SHOW_COLUMNS)
+  filters = {
+    'when': request.args.get('when') or None,
+    'date_from': parse_date(request.args.get('from')),
+    'date_to': parse_date(request.args.get('to')),
+    'genre_id': request.args.get('genre', type=int),
+    'city': request.args.get('city') or None
+  }
+  if _wants_jsonl():
+    return _jsonl(show_stream(after=request.args.get('after'), fields=fields, **filters))
+  result = show_listing(after=request.args.get('after'), before=request.args.get('before'),
+    limit=_limit(), fields=fields, **filters)
+  return _json({
+    'data': result['shows'],
+    'prev_cursor': result['prev_cursor'],
+    'next_cursor': result['next_cursor']
+  })
+
+@bp.route('/shows/<int:show_id>')
+def show(show_id):
+  row = show_row(show_id, _fields(SHOW_COLUMNS))
+  if row is None:
+    abort(404)
+  return _json({'data': row})
+
+@bp.route('/calendar')
+@conditional('shows')
+def calendar():
+  # ?from=&to= (YYYY-MM-DD, to exclusive) bucketed by ?bucket=day|week,
+  # optionally for one ?venue=, ?artist=, ?city= or ?genre=; each bucket
+  # lists its first ?per_bucket= shows
+  date_from = parse_date(request.args.get('from'))
+  date_to = parse_date(request.args.get('to'))
+  bucket = request.args.get('bucket', 'day')
+  if date_from is None or date_to is None or date_to <= date_from:
+    abort(400, 'from and to are required and from must be before to')
+  if (date_to - date_from).days > current_app.config['CALENDAR_MAX_DAYS']:
+    abort(400, 'Window is longer than %d days' % current_app.config['CALENDAR_MAX_DAYS'])
+  if bucket not in CALENDAR_BUCKETS:
+    abort(400, 'Unsupported bucket: ' + bucket)
+  data = show_calendar(date_from, date_to, bucket,
+    venue_id=request.args.get('venue', type=int),
+    artist_id=request.args.get('artist', type=int),
+    city=request.args.get('city') or None,
+    genre_id=request.args.get('genre', type=int),
+    shows_per_bucket=min(max(request.args.get('per_bucket', current_app.config['CALENDAR_SHOWS_PER_BUCKET'], type=int), 0),
+      current_app.config['CALENDAR_MAX_SHOWS_PER_BUCKET']))
+  return _json({'bucket': bucket, 'from': date_from, 'to': date_to, 'data': data})
+
+@bp.route('/import/<kind>', methods=['POST'])
+@token_required
+def bulk_import(kind):
+  # Body is the raw CSV/JSONL (or a multipart upload named 'file'); it is read
+  # as a stream, so large files are never buffered whole.
+  if kind not in KINDS:
+    abort(404)
+  upload = request.files.get('file')
+  raw = upload.stream if upload else request.stream
+  format = request.args.get('format') \
+    or ('csv' if (upload and upload.filename.endswith('.csv')) or request.mimetype == 'text/csv' else 'jsonl')
+  if format not in ('csv', 'jsonl'):
+    abort(400, 'Unsupported format: ' + format)
+  stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+  report = import_stream(kind, stream, format, request.args.get('batch_size', type=int))
+  return _json(report, status=200 if not report['errors'] else 207)
+
+@bp.route('/export/<kind>')
+@token_required
+def bulk_export(kind):
+  if kind not in KINDS:
+    abort(404)
+  format = request.args.get('format', 'csv')
+  if format not in exporter.FORMATS:
+    abort(400, 'Unsupported format: ' + format)
+  compress = request.args.get('gzip') == '1'
+  chunks = exporter.export(kind, format, compress,
+    date_from=parse_date(request.args.get('from')),
+    date_to=parse_date(request.args.get('to')),
+    city=request.args.get('city') or None,
+    state=request.args.get('state') or None)
+
+  filename = '%s.%s' % (kind, 'csv' if format == 'csv' else 'jsonl')
+  mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+  if compress:
+    filename, mimetype = filename + '.gz', 'application/gzip'
+  return Response(stream_with_context(chunks), mimetype=mimetype,
+    headers={'Content-Disposition': 'attachment; filename=' + filename})
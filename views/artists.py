@@ -0,0 +1,130 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app
+from forms import ArtistForm
+from models import db, Artist, Show
+from queries import entity_listing, artist_profile, artist_venue_ids, show_feed
+from cache import cached, conditional, invalidate
+from views import search_filters, feed_start, calendar_response
+import search
+
+bp = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@bp.route('/artists')
+@conditional('artists')
+@cached('artists')
+def artists():
+  # DONE: replace with real data returned from querying the database
+  data = entity_listing(Artist, ('id', 'name'), genre_id=request.args.get('genre', type=int))['data']
+
+  return render_template('pages/artists.html', artists=data)
+
+@bp.route('/artists/search', methods=['GET', 'POST'])
+def search_artists():
+  # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term = request.values.get('search_term', '')
+  filters = search_filters()
+  result = search.search_artists(search_term, page=request.values.get('page', 1, type=int), **filters)
+
+  return render_template('pages/search_artists.html', results=result, search_term=search_term, filters=filters)
+
+@bp.route('/artists/<int:artist_id>')
+@conditional('artist:{artist_id}')
+@cached('artist:{artist_id}')
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+  # DONE: replace with real artist data from the artist table, using artist_id
+  data = artist_profile(artist_id,
+    upcoming_limit=current_app.config['PROFILE_UPCOMING_SHOWS'],
+    past_limit=current_app.config['PROFILE_PAST_SHOWS'],
+    past_before=request.args.get('past_before'))
+  if data is None:
+    abort(404)
+
+  return render_template('pages/show_artist.html', artist=data)
+
+@bp.route('/artists/<int:artist_id>/calendar.ics')
+@conditional('artist:{artist_id}')
+def artist_calendar(artist_id):
+  artist = Artist.query.get(artist_id)
+  if artist is None:
+    abort(404)
+  return calendar_response(artist.name, show_feed(Show.artist_id, artist_id, feed_start()),
+    'artist-%d.ics' % artist_id)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  form = ArtistForm()
+  artist = vars(Artist.query.get(artist_id))
+  form.genres.data = [(genre) for genre in artist['genres']]
+
+  # DONE: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # DONE: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  try:
+    artist = Artist.query.get(artist_id)
+    form = ArtistForm()
+    artist.name = form.name.data
+    artist.city = form.city.data
+    artist.state = form.state.data
+    artist.phone = form.phone.data
+    artist.genres = form.genres.data
+    artist.image_link = form.image_link.data
+    artist.facebook_link = form.facebook_link.data
+    artist.website_link = form.website_link.data
+    artist.seeking_venue = form.seeking_venue.data
+    artist.seeking_description = form.seeking_description.data
+    db.session.commit()
+    invalidate('artists', 'shows', 'artist:%d' % artist_id, *['venue:%d' % v for v in artist_venue_ids(artist_id)])
+  except Exception as e:
+    flash(e)
+    db.session.rollback()
+  finally:
+    db.session.close()
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  try:
+  # called upon submitting the new artist listing form
+  # DONE: insert form data as a new Venue record in the db, instead
+  # DONE: modify data to be the data object returned from db insertion
+    form = ArtistForm(request.form)
+    artist = Artist()
+    form.populate_obj(artist)
+    db.session.add(artist)
+    db.session.commit()
+    invalidate('artists')
+    # on successful db insert, flash success
+    flash('Artist ' + request.form['name'] + ' was successfully created!')
+  except:
+  # DONE: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Artist ' + request.form['name'] + ' could not be created.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    return render_template('pages/home.html')
@@ -0,0 +1,103 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, render_template, request, flash
+from sqlalchemy import exc
+from forms import ShowForm
+from models import db, Show, SHOW_DEFAULT_DURATION
+from queries import show_listing, booking_conflicts
+from cache import cached, conditional, invalidate
+import counters
+import areas
+from views import parse_date
+
+bp = Blueprint('shows', __name__)
+
+# SQLSTATE raised when an insert violates an exclusion constraint.
+EXCLUSION_VIOLATION = '23P01'
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@bp.route('/shows')
+@conditional('shows')
+@cached('shows')
+def shows():
+  # displays list of shows at /shows
+  # DONE: replace with real venues data.
+  filters = {
+    'when': request.args.get('when') or None,
+    'from': request.args.get('from') or None,
+    'to': request.args.get('to') or None,
+    'genre': request.args.get('genre', type=int) or None,
+    'city': request.args.get('city') or None
+  }
+  result = show_listing(
+    after=request.args.get('after'),
+    before=request.args.get('before'),
+    when=filters['when'],
+    date_from=parse_date(filters['from']),
+    date_to=parse_date(filters['to']),
+    genre_id=filters['genre'],
+    city=filters['city']
+  )
+
+  return render_template('pages/shows.html', shows=result['shows'], filters=filters,
+    prev_cursor=result['prev_cursor'], next_cursor=result['next_cursor'])
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # The templates carry no CSRF token (none of the forms do), so only the
+  # fields themselves are validated.
+  form = ShowForm(meta={'csrf': False})
+  if not form.validate():
+    return render_template('forms/new_show.html', form=form), 400
+  conflicts = []
+  try:
+  # called to create new shows in the db, upon submitting new show listing form
+  # DONE: insert form data as a new Show record in the db, instead
+    start_time = form.start_time.data
+    end_time = form.end_time.data or start_time + SHOW_DEFAULT_DURATION
+    # Refuse double bookings up front so the clashing shows can be listed.
+    conflicts = booking_conflicts(form.venue_id.data, form.artist_id.data, start_time, end_time)
+    if not conflicts:
+      show = Show(
+        artist_id = form.artist_id.data,
+        venue_id = form.venue_id.data,
+        start_time = start_time,
+        end_time = end_time
+      )
+      db.session.add(show)
+      counters.show_added(show.venue_id, show.artist_id, show.start_time)
+      areas.schedule_refresh()
+      db.session.commit()
+      invalidate('venues', 'shows', 'venue:%d' % show.venue_id, 'artist:%d' % show.artist_id)
+      # on successful db insert, flash success
+      flash('Show was successfully created!')
+  except exc.IntegrityError as e:
+    db.session.rollback()
+    if getattr(e.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+      # A concurrent booking won the race; the exclusion constraint caught it.
+      conflicts = booking_conflicts(form.venue_id.data, form.artist_id.data, start_time, end_time)
+    if not conflicts:
+      flash('An error occurred. Show could not be created.')
+      print(sys.exc_info())
+  except:
+  # DONE: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Show could not be created.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+  if conflicts:
+    flash('Show could not be created: the venue or artist is already booked at that time.')
+    return render_template('forms/new_show.html', form=form, conflicts=conflicts), 409
+  return render_template('pages/home.html')
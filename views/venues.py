@@ -0,0 +1,174 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+import sys
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, abort, current_app
+from forms import VenueForm
+from models import db, Venue, Artist, Show
+from queries import venue_areas, venues_nearby, venue_profile, show_feed, venue_artist_ids
+from cache import cached, conditional, invalidate
+from views import search_filters, nearby_point, feed_start, calendar_response
+import search
+import counters
+import areas
+
+bp = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@bp.route('/venues')
+@conditional('venues')
+@cached('venues')
+def venues():
+  # DONE: replace with real venues data.
+  #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+  return render_template('pages/venues.html', areas=venue_areas(request.args.get('genre', type=int)))
+
+@bp.route('/venues/search', methods=['GET', 'POST'])
+def search_venues():
+  # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term = request.values.get('search_term', '')
+  filters = search_filters()
+  result = search.search_venues(search_term, page=request.values.get('page', 1, type=int), **filters)
+
+  return render_template('pages/search_venues.html', results=result, search_term=search_term, filters=filters)
+
+@bp.route('/venues/nearby')
+def nearby_venues():
+  # Venues around ?lat=&lng= within ?radius= km, nearest first; without a
+  # point the page just shows the search form.
+  point = nearby_point()
+  venues = venues_nearby(limit=current_app.config['NEARBY_LIMIT'],
+    shows_per_venue=current_app.config['NEARBY_SHOWS_PER_VENUE'], **point) if point else []
+  return render_template('pages/nearby_venues.html', venues=venues, point=point)
+
+@bp.route('/venues/<int:venue_id>')
+@conditional('venue:{venue_id}')
+@cached('venue:{venue_id}')
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # DONE: replace with real venue data from the venues table, using venue_id
+  data = venue_profile(venue_id,
+    upcoming_limit=current_app.config['PROFILE_UPCOMING_SHOWS'],
+    past_limit=current_app.config['PROFILE_PAST_SHOWS'],
+    past_before=request.args.get('past_before'))
+  if data is None:
+    abort(404)
+
+  return render_template('pages/show_venue.html', venue=data)
+
+@bp.route('/venues/<int:venue_id>/calendar.ics')
+@conditional('venue:{venue_id}')
+def venue_calendar(venue_id):
+  venue = Venue.query.get(venue_id)
+  if venue is None:
+    abort(404)
+  return calendar_response(venue.name, show_feed(Show.venue_id, venue_id, feed_start()),
+    'venue-%d.ics' % venue_id)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # DONE: insert form data as a new Venue record in the db, instead
+  # DONE: modify data to be the data object returned from db insertion
+  try:
+    form = VenueForm(request.form)
+    venue = Venue()
+    form.populate_obj(venue)
+    db.session.add(venue)
+    areas.schedule_refresh()
+    db.session.commit()
+    invalidate('venues')
+    flash('Venue ' + request.form['name'] + ' was successfully created!')
+  except:
+    # DONE: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be created.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    return render_template('pages/home.html')
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # DONE: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  venue = Venue.query.get(venue_id)
+  if venue is None:
+    abort(404)
+  try:
+    artist_ids = venue_artist_ids(venue.id)
+    stale = ['venues', 'shows', 'venue:%d' % venue.id] + ['artist:%d' % a for a in artist_ids]
+    db.session.delete(venue)
+    # The venue's shows go with it, so its artists' counters must be redone.
+    db.session.flush()
+    counters.recount(Artist, artist_ids)
+    areas.schedule_refresh()
+    db.session.commit()
+    invalidate(*stale)
+    message = 'Delete success.'
+  except Exception as e:
+    db.session.rollback()
+    message = 'Delete failed. ' + str(e)
+  finally:
+    db.session.close()
+
+  return jsonify({ 'message': message })
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  form = VenueForm()
+  venue = vars(Venue.query.get(venue_id))
+  form.genres.data = [(genre) for genre in venue['genres']]
+
+  # DONE: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # DONE: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  try:
+    venue = Venue.query.get(venue_id)
+    form = VenueForm()
+    if (venue.address, venue.city, venue.state) != (form.address.data, form.city.data, form.state.data):
+      # Moved: the old coordinates no longer apply; the next geocoder run
+      # fills in new ones.
+      venue.latitude = venue.longitude = None
+    venue.name = form.name.data
+    venue.city = form.city.data
+    venue.state = form.state.data
+    venue.address = form.address.data
+    venue.phone = form.phone.data
+    venue.genres = form.genres.data
+    venue.image_link = form.image_link.data
+    venue.facebook_link = form.facebook_link.data
+    venue.website_link = form.website_link.data
+    venue.seeking_talent = form.seeking_talent.data
+    venue.seeking_description = form.seeking_description.data
+    areas.schedule_refresh()
+    db.session.commit()
+    invalidate('venues', 'shows', 'venue:%d' % venue_id, *['artist:%d' % a for a in venue_artist_ids(venue_id)])
+  except Exception as e:
+    flash(e)
+    db.session.rollback()
+  finally:
+    db.session.close()
+
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))